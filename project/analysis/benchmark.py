@@ -0,0 +1,230 @@
+"""
+benchmark.py
+
+Offline throughput benchmark of the tracker against a recorded session
+(see analysis/record.py). Frames are replayed as fast as possible, so the
+numbers reflect processing cost only.
+
+Usage:
+    python analysis/benchmark.py sessions/tv_01.mjpg [--gesture [mediapipe|skin|fake]] [--limit 500]
+    python analysis/benchmark.py sessions/tv_01.mjpg --pyramid
+    python analysis/benchmark.py sessions/tv_01.mjpg --backends [--reference houghp]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(PROJECT_ROOT)
+
+import cv2
+import numpy as np
+
+from app.stream_corners import MIN_SUPPORT, PYRAMID_LEVEL
+from model.corners import CornerDetector, LINE_BACKENDS
+from utils.replay import ReplaySource
+
+
+def report(name, times):
+    if not times:
+        print(f"{name:12s}  no frames")
+        return
+    total = sum(times)
+    n = len(times)
+    ms = sorted(t * 1000 for t in times)
+    print(f"{name:12s}  {n:5d} frames  {n / total:7.1f} fps  "
+          f"mean {total / n * 1000:6.2f} ms  p95 {ms[int(0.95 * (n - 1))]:6.2f} ms")
+
+
+def make_controller(backend):
+    """Gesture controller; "fake" replays scripted swipes and pinches."""
+    from model.hand_gesture import HandGestureController
+
+    if backend == "fake":
+        from model.hand_backends import ScriptedHands, swipe_track, pinch_track
+        track = []
+        for direction in ("left", "right", "up", "down"):
+            track += swipe_track(direction, start=(0.5, 0.5)) + [None] * 5
+        track += pinch_track()
+        backend = ScriptedHands(track, loop=True)
+
+    return HandGestureController(backend=backend)
+
+
+def run(archive, gesture=None, limit=None):
+    """gesture: hand backend name ("mediapipe", "skin", "fake") or None."""
+    src = ReplaySource(archive, realtime=False)
+    print(f"Replaying {len(src)} frames ({src.duration():.1f}s recorded) from {archive}\n")
+
+    controller = make_controller(gesture) if gesture else None
+    events = 0
+
+    detector = CornerDetector()
+
+    t_decode, t_corners, t_gesture = [], [], []
+    found = 0
+
+    while limit is None or len(t_decode) < limit:
+        t0 = time.perf_counter()
+        ret, frame = src.read()
+        if not ret:
+            break
+        t1 = time.perf_counter()
+
+        corners = detector.detect(frame).corners
+        t2 = time.perf_counter()
+
+        t_decode.append(t1 - t0)
+        t_corners.append(t2 - t1)
+        found += corners is not None
+
+        if controller is not None:
+            # Scripted landmarks are relative to the crop, so the fake runs
+            # on the whole frame to keep its events deterministic
+            box = None if gesture == "fake" else corners
+            direction, _ = controller.detect_gesture(frame, box=box, timestamp=src.timestamp)
+            events += direction is not None
+            t_gesture.append(time.perf_counter() - t2)
+
+    report("decode", t_decode)
+    report("corners", t_corners)
+    if controller is not None:
+        report(f"gesture/{gesture}", t_gesture)
+    print(f"\nQuad found in {found}/{len(t_corners)} frames")
+    if controller is not None:
+        print(f"Gesture events: {events}")
+
+    print("\nCorner stages (mean ms/frame):")
+    for stage, ms in detector.stage_report().items():
+        print(f"   {stage:10s} {ms:7.2f}")
+
+    src.release()
+
+
+def load_frames(archive, limit=None):
+    src = ReplaySource(archive, realtime=False)
+    frames = []
+    while limit is None or len(frames) < limit:
+        ret, frame = src.read()
+        if not ret:
+            break
+        frames.append(frame)
+    src.release()
+    return frames
+
+
+def run_backends(archive, limit=None, backends=None, reference="houghp"):
+    """
+    Line-detector backends side by side: detections/sec, quad hit rate,
+    and median / p95 corner distance from the `reference` backend
+    (refined with cornerSubPix, like the candidates).
+    """
+    frames = load_frames(archive, limit)
+    backends = backends or list(LINE_BACKENDS)
+
+    ref = CornerDetector(lines=reference, refine="subpix")
+    reference_corners = [ref.detect(f).corners for f in frames]
+
+    print(f"Line backends on {len(frames)} frames (accuracy vs '{reference}')\n")
+    print(f"{'backend':>8s} {'det/s':>8s} {'lines ms':>9s} {'found':>7s} "
+          f"{'med px':>7s} {'p95 px':>7s}")
+
+    for name in backends:
+        detector = CornerDetector(lines=name, refine="subpix")
+        times, devs = [], []
+        found = 0
+
+        for f, ref_c in zip(frames, reference_corners):
+            t0 = time.perf_counter()
+            corners = detector.detect(f).corners
+            times.append(time.perf_counter() - t0)
+
+            found += corners is not None
+            if corners is not None and ref_c is not None:
+                devs.append(np.linalg.norm(np.subtract(corners, ref_c), axis=1).max())
+
+        mean = sum(times) / len(times)
+        stages = detector.stage_report()
+        med = f"{np.median(devs):7.2f}" if devs else "    n/a"
+        p95 = f"{np.percentile(devs, 95):7.2f}" if devs else "    n/a"
+        print(f"{name:>8s} {1 / mean:8.1f} {stages['lines']:9.2f} "
+              f"{found:3d}/{len(frames):<3d} {med} {p95}")
+
+
+def run_pyramid(archive, limit=None, widths=(640, 800, 1600),
+                levels=tuple(sorted({1, PYRAMID_LEVEL, 4})),
+                refine="harris", min_support=MIN_SUPPORT, tol=1.0):
+    """
+    Speed of full-res vs coarse-to-fine detection against frame width, both
+    with the tracker's settings (app/stream_corners.py: MIN_SUPPORT, and
+    its single Harris refinement step).
+    Deviation is the corner distance from full-res detection, per frame
+    the max over the 4 corners; frames found by only one side count as
+    misses. Returns True if every compared frame stayed within tol px.
+    """
+    frames = load_frames(archive, limit)
+
+    print(f"Pyramid benchmark on {len(frames)} frames "
+          f"(refine={refine}, min_support={min_support})\n")
+    print(f"{'width':>6s} {'level':>5s} {'fps':>8s} {'mean ms':>8s} "
+          f"{'med px':>7s} {'max px':>7s} {'within':>7s} {'misses':>6s}")
+
+    ok = True
+    for width in widths:
+        scaled = [cv2.resize(f, (width, width * f.shape[0] // f.shape[1]),
+                             interpolation=cv2.INTER_AREA) for f in frames]
+        full = CornerDetector(refine=refine, min_support=min_support)
+        reference = [full.detect(f).corners for f in scaled]
+
+        for level in levels:
+            detector = CornerDetector(refine=refine, min_support=min_support,
+                                      pyramid_min_width=0, pyramid_level=level)
+            times, devs, misses = [], [], 0
+            for f, ref in zip(scaled, reference):
+                t0 = time.perf_counter()
+                corners = detector.detect(f).corners
+                times.append(time.perf_counter() - t0)
+                if corners is not None and ref is not None:
+                    devs.append(np.hypot(*np.subtract(corners, ref).T).max())
+                elif (corners is None) != (ref is None):
+                    misses += 1
+
+            mean = sum(times) / len(times)
+            if devs:
+                within = sum(d <= tol for d in devs)
+                dev = f"{np.median(devs):7.2f} {max(devs):7.2f} {within:3d}/{len(devs):<3d}"
+                ok &= within == len(devs)
+            else:
+                dev = f"{'n/a':>7s} {'n/a':>7s} {'n/a':>7s}"
+            print(f"{width:6d} {level:5d} {1 / mean:8.1f} {mean * 1000:8.2f} {dev} {misses:6d}")
+
+    print(f"\n{'✔' if ok else '✖'} Pyramid corners within {tol:g} px of full resolution")
+    return ok
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline tracker benchmark")
+    parser.add_argument("archive", help="recorded .mjpg archive")
+    parser.add_argument("--gesture", nargs="?", const="mediapipe", default=None,
+                        choices=["mediapipe", "skin", "fake"],
+                        help="also time gesture detection with this hand backend "
+                             "(fake: scripted landmarks, no model)")
+    parser.add_argument("--pyramid", action="store_true",
+                        help="compare full-res and pyramid detection across widths")
+    parser.add_argument("--backends", nargs="*", choices=list(LINE_BACKENDS),
+                        help="compare line-detector backends (default: all)")
+    parser.add_argument("--reference", default="houghp", choices=list(LINE_BACKENDS),
+                        help="backend used as the accuracy reference")
+    parser.add_argument("--tol", type=float, default=1.0,
+                        help="--pyramid: max allowed deviation from full-res, px")
+    parser.add_argument("--limit", type=int, default=None)
+    args = parser.parse_args()
+
+    if args.backends is not None:
+        run_backends(args.archive, args.limit, args.backends, args.reference)
+    elif args.pyramid:
+        sys.exit(0 if run_pyramid(args.archive, args.limit, tol=args.tol) else 1)
+    else:
+        run(args.archive, args.gesture, args.limit)
@@ -1,6 +1,12 @@
 import cv2
 import numpy as np
 import os
+import sys
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(PROJECT_ROOT)
+
+from utils.stream import LatestFrameGrabber
 
 # ESP32 stream URL
 STREAM_URL = "http://192.168.4.35/high-quality-stream"
@@ -33,10 +39,11 @@ def save_frame(event, x, y, flags, param):
 
 
 # Start stream
-cap = cv2.VideoCapture(STREAM_URL)
+cap = LatestFrameGrabber(STREAM_URL)
 if not cap.isOpened():
     print("ESP32 Stream not working")
     exit()
+cap.start()
 
 cv2.namedWindow("Live Stream")
 cv2.setMouseCallback("Live Stream", save_frame)
@@ -44,9 +51,11 @@ cv2.setMouseCallback("Live Stream", save_frame)
 print("🎥 Live feed running — click the window to save frames, press 'q' to quit.")
 
 while True:
-    ret, frame = cap.read()
+    ret, frame = cap.read_latest()
     if not ret:
-        print("No frame received.")
+        # No new frame yet
+        if cv2.waitKey(1) & 0xFF == ord('q'):
+            break
         continue
 
     current_frame = frame.copy()
@@ -0,0 +1,122 @@
+"""
+esp32_standin.py
+
+Local HTTP stand-in for the ESP32 camera web server.
+Serves a folder of JPEGs on the same endpoints and with the same
+multipart framing as CameraStream/app.httpd.cpp, so the stream readers
+can be exercised without the hardware.
+
+Usage:
+    python analysis/esp32_standin.py [image_dir] [--port 8080] [--fps 15]
+    → http://127.0.0.1:8080/high-quality-stream
+"""
+
+import argparse
+import glob
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import cv2
+
+
+# Same framing as the firmware
+STREAM_CONTENT_TYPE = "multipart/x-mixed-replace; boundary=--frame"
+STREAM_BOUNDARY = b"\r\n--frame\r\n"
+STREAM_PART = b"Content-Type: image/jpeg\r\n\r\n"
+
+# endpoint → (width, height, jpeg quality), mirroring the firmware's
+# framesize / sensor quality per endpoint
+ENDPOINTS = {
+    "/low-quality-stream":   (640, 480, 60),
+    "/high-quality-stream":  (800, 600, 80),
+    "/ultra-quality-stream": (1600, 1200, 90),
+}
+
+
+def load_jpegs(image_dir):
+    """Pre-encode every image once per endpoint resolution."""
+    paths = sorted(glob.glob(os.path.join(image_dir, "*.jpg")))
+    images = [cv2.imread(p) for p in paths]
+    images = [img for img in images if img is not None]
+    if not images:
+        raise ValueError(f"No images found in {image_dir}")
+
+    encoded = {}
+    for endpoint, (w, h, q) in ENDPOINTS.items():
+        frames = []
+        for img in images:
+            resized = cv2.resize(img, (w, h), interpolation=cv2.INTER_AREA)
+            ok, buf = cv2.imencode(".jpg", resized, [cv2.IMWRITE_JPEG_QUALITY, q])
+            if ok:
+                frames.append(buf.tobytes())
+        encoded[endpoint] = frames
+    return encoded
+
+
+def make_server(image_dir, host="127.0.0.1", port=8080, fps=15.0):
+    """Return a ThreadingHTTPServer; call serve_forever() to run it."""
+    encoded = load_jpegs(image_dir)
+    delay = 1.0 / fps if fps > 0 else 0.0
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, fmt, *args):
+            pass
+
+        def do_GET(self):
+            frames = encoded.get(self.path)
+            if frames is None:
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain")
+                self.end_headers()
+                self.wfile.write("\n".join(ENDPOINTS).encode() + b"\n")
+                return
+
+            self.send_response(200)
+            self.send_header("Content-Type", STREAM_CONTENT_TYPE)
+            self.send_header("Access-Control-Allow-Origin", "*")
+            self.end_headers()
+
+            i = 0
+            try:
+                while True:
+                    self.wfile.write(STREAM_BOUNDARY)
+                    self.wfile.write(STREAM_PART)
+                    self.wfile.write(frames[i % len(frames)])
+                    self.wfile.write(b"\r\n")
+                    self.wfile.flush()
+                    i += 1
+                    time.sleep(delay)
+            except (BrokenPipeError, ConnectionResetError):
+                return
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    return server
+
+
+def serve_in_background(image_dir, host="127.0.0.1", port=0, fps=15.0):
+    """Start a stand-in server on a thread. Returns (server, base_url)."""
+    server = make_server(image_dir, host, port, fps)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    host, port = server.server_address[:2]
+    return server, f"http://{host}:{port}"
+
+
+if __name__ == "__main__":
+    SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+    parser = argparse.ArgumentParser(description="ESP32 stream stand-in")
+    parser.add_argument("image_dir", nargs="?",
+                        default=os.path.join(SCRIPT_DIR, "captured_frames"))
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--fps", type=float, default=15.0)
+    args = parser.parse_args()
+
+    server = make_server(args.image_dir, args.host, args.port, args.fps)
+    print(f"Serving {args.image_dir} on http://{args.host}:{args.port}")
+    for endpoint in ENDPOINTS:
+        print(f"   • {endpoint}")
+    server.serve_forever()
@@ -0,0 +1,70 @@
+"""
+record.py
+
+Records the raw ESP32 JPEG stream into an append-only archive
+(<name>.mjpg + <name>.mjpg.idx) for offline replay and benchmarking.
+
+Usage:
+    python analysis/record.py sessions/tv_01.mjpg --seconds 30
+"""
+
+import argparse
+import os
+import sys
+import time
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(PROJECT_ROOT)
+
+from utils.mjpeg import MJPEGStream
+from utils.replay import FrameRecorder
+
+STREAM_URL = "http://192.168.4.35/high-quality-stream"
+
+
+def record(url, path, seconds=None, max_frames=None):
+    stream = MJPEGStream(url)
+    if not stream.isOpened():
+        raise RuntimeError(f"Cannot open stream: {url}")
+
+    print(f"🎥 Recording {url}")
+    print(f"📁 Archive: {path}  (Ctrl+C to stop)")
+
+    start = time.time()
+    with FrameRecorder(path) as rec:
+        try:
+            while True:
+                jpeg = stream.read_jpeg()
+                if jpeg is None:
+                    print("⚠ Stream ended.")
+                    break
+
+                rec.write(jpeg)
+
+                if rec.frames % 30 == 0:
+                    elapsed = time.time() - start
+                    print(f"  {rec.frames} frames  {rec.frames / elapsed:.1f} fps")
+
+                if max_frames is not None and rec.frames >= max_frames:
+                    break
+                if seconds is not None and time.time() - start >= seconds:
+                    break
+        except KeyboardInterrupt:
+            pass
+
+        frames = rec.frames
+
+    stream.release()
+    print(f"💾 Recorded {frames} frames in {time.time() - start:.1f}s")
+    return frames
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Record the ESP32 stream")
+    parser.add_argument("archive", help="output .mjpg archive path")
+    parser.add_argument("--url", default=STREAM_URL)
+    parser.add_argument("--seconds", type=float, default=None)
+    parser.add_argument("--frames", type=int, default=None)
+    args = parser.parse_args()
+
+    record(args.url, args.archive, args.seconds, args.frames)
@@ -1,5 +1,12 @@
 import cv2
 import mediapipe as mp
+import sys
+import os
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(PROJECT_ROOT)
+
+from utils.stream import LatestFrameGrabber
 
 STREAM_URL = "http://192.168.4.35/high-quality-stream" 
 
@@ -8,9 +15,10 @@ mp_draw = mp.solutions.drawing_utils
 
 def main():
 
-    cap = cv2.VideoCapture(STREAM_URL)
+    cap = LatestFrameGrabber(STREAM_URL, native=True)
     if not cap.isOpened():
         raise RuntimeError("Cannot open stream")
+    cap.start()
 
     with mp_hands.Hands(
         max_num_hands=1,
@@ -19,8 +27,10 @@ def main():
     ) as hands:
 
         while True:
-            ret, frame = cap.read()
+            ret, frame = cap.read_latest()
             if not ret:
+                if cv2.waitKey(1) & 0xFF == ord('q'):
+                    break
                 continue
 
             img_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
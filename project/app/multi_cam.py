@@ -0,0 +1,267 @@
+"""
+multi_cam.py
+
+Runs the screen-corner + gesture pipeline for several ESP32 cameras at once.
+One supervisor process starts a worker process per camera (pinned to its
+own core where the OS allows it), and merges every worker's results into a
+single output stream together with per-camera frame-rate / drop reports.
+Cameras given their own calibration file also report their corners
+lens-corrected ("undistorted", raw pixels in "corners"); cameras without
+one report "undistorted": null rather than borrow another lens's intrinsics.
+Gesture inference runs on a thread inside each worker, so corner results
+come at camera rate and gesture events at their own rate.
+
+Usage:
+    python app/multi_cam.py \
+        --cam http://192.168.4.35/high-quality-stream data/CALI/calibration/calibration_data_opt.npz \
+        --cam http://192.168.4.36/high-quality-stream
+"""
+
+import argparse
+import json
+import multiprocessing as mp
+import os
+import queue
+import sys
+import time
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(PROJECT_ROOT)
+
+STATS_INTERVAL = 2.0   # seconds between per-camera reports
+
+
+def pin_to_core(core):
+    """Pin the current process to one core (Linux only; no-op elsewhere)."""
+    if core is None or not hasattr(os, "sched_setaffinity"):
+        return False
+    try:
+        os.sched_setaffinity(0, {core})
+        return True
+    except OSError:
+        return False
+
+
+# ============================================================
+# Worker: one camera, one process
+# ============================================================
+def camera_worker(cam_id, url, calib_path, core, results, stop, gestures=True,
+                  hands="mediapipe"):
+    pinned = pin_to_core(core)
+
+    # Heavy imports happen in the worker, after pinning
+    import cv2
+    from model.corners import CornerDetector
+    from model.undistort import Undistorter
+    from utils.stream import LatestFrameGrabber
+
+    cv2.setNumThreads(1)
+
+    # One detector per worker: its image buffers are reused frame to frame
+    detector = CornerDetector(refine="harris")
+
+    # Per-camera intrinsics: detected corners are also reported lens-corrected.
+    # A calibration that was given but cannot be found is an error, not a
+    # silent fall-back to raw corners
+    undistorter = None
+    if calib_path:
+        if not os.path.isfile(calib_path):
+            results.put({"type": "error", "cam": cam_id,
+                         "error": f"No calibration file {calib_path}"})
+            return
+        undistorter = Undistorter.from_file(calib_path)
+
+    gesture_worker = None
+    if gestures:
+        from model.hand_gesture import GestureWorker, HandGestureController
+        controller = HandGestureController(backend=hands)
+        try:
+            controller.backend          # build the model now, not on the worker thread
+        except Exception as e:
+            results.put({"type": "error", "cam": cam_id,
+                         "error": f"Hand backend {hands!r}: {e!r}"})
+            return
+        gesture_worker = GestureWorker(controller).start()
+
+    grabber = LatestFrameGrabber(url, native=True)
+    if not grabber.isOpened():
+        results.put({"type": "error", "cam": cam_id, "error": f"Cannot open {url}"})
+        return
+    grabber.start()
+
+    results.put({"type": "started", "cam": cam_id, "url": url,
+                 "core": core if pinned else None,
+                 "calibrated": undistorter is not None})
+
+    processed = 0
+    last_report = time.time()
+    last_processed = 0
+
+    while not stop.is_set():
+        ret, frame = grabber.read_latest()
+        if not ret:
+            if grabber.finished:
+                results.put({"type": "ended", "cam": cam_id})
+                break
+            time.sleep(0.002)
+            continue
+
+        corners = detector.detect(frame).corners
+
+        undistorted = None
+        if corners is not None and undistorter is not None:
+            undistorted = undistorter.undistort_points(corners, frame.shape)
+
+        if gesture_worker is not None:
+            # submit() copies the hand crop; the gesture thread never sees `frame`
+            gesture_worker.submit(frame, grabber.timestamp, box=corners)
+            for direction, ts in gesture_worker.poll():
+                results.put({"type": "gesture", "cam": cam_id,
+                             "timestamp": ts, "gesture": direction})
+
+        processed += 1
+        results.put({
+            "type": "result",
+            "cam": cam_id,
+            "frame": grabber.frame_id,
+            "timestamp": grabber.timestamp,
+            "latency": time.time() - grabber.timestamp,
+            "corners": None if corners is None
+                       else [[float(x), float(y)] for x, y in corners],
+            "undistorted": None if undistorted is None
+                           else [[float(x), float(y)] for x, y in undistorted],
+        })
+
+        now = time.time()
+        if now - last_report >= STATS_INTERVAL:
+            results.put({
+                "type": "stats",
+                "cam": cam_id,
+                "fps": (processed - last_processed) / (now - last_report),
+                "processed": processed,
+                "gesture_fps": gesture_worker.stats()["fps"] if gesture_worker else None,
+                **grabber.stats(),
+            })
+            last_report = now
+            last_processed = processed
+
+    if gesture_worker is not None:
+        gesture_worker.stop()
+    grabber.release()
+
+
+# ============================================================
+# Supervisor
+# ============================================================
+class MultiCameraSupervisor:
+    """
+    cameras: list of (url, calib_path) pairs; calib_path is None for a
+    camera without its own calibration (no undistortion).
+    Iterate over the supervisor to receive merged per-camera messages.
+    """
+
+    def __init__(self, cameras, gestures=True, pin=True, hands="mediapipe"):
+        self.cameras = cameras
+        self.gestures = gestures
+        self.hands = hands
+        self.pin = pin
+
+        self._ctx = mp.get_context("spawn")
+        self.results = self._ctx.Queue()
+        self.stop_event = self._ctx.Event()
+        self.workers = []
+        self.stats = {}
+
+    def _cores(self):
+        if hasattr(os, "sched_getaffinity"):
+            return sorted(os.sched_getaffinity(0))
+        return list(range(os.cpu_count() or 1))
+
+    def start(self):
+        cores = self._cores()
+
+        for cam_id, (url, calib) in enumerate(self.cameras):
+            core = cores[cam_id % len(cores)] if self.pin else None
+            p = self._ctx.Process(
+                target=camera_worker,
+                args=(cam_id, url, calib, core, self.results,
+                      self.stop_event, self.gestures, self.hands),
+                daemon=True,
+            )
+            p.start()
+            self.workers.append(p)
+
+        return self
+
+    def __iter__(self):
+        while any(p.is_alive() for p in self.workers) or not self.results.empty():
+            try:
+                msg = self.results.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            if msg["type"] == "stats":
+                self.stats[msg["cam"]] = msg
+            yield msg
+
+    def report(self):
+        for cam_id, (url, _) in enumerate(self.cameras):
+            s = self.stats.get(cam_id)
+            if s is None:
+                print(f"[cam {cam_id}] {url}: no stats yet")
+                continue
+            gesture = "" if s["gesture_fps"] is None \
+                else f"  gestures {s['gesture_fps']:5.1f} fps"
+            print(f"[cam {cam_id}] {s['fps']:5.1f} fps{gesture}  "
+                  f"processed {s['processed']}  dropped {s['dropped']}  "
+                  f"failed reads {s['failed']}")
+
+    def stop(self):
+        self.stop_event.set()
+        for p in self.workers:
+            p.join(timeout=2.0)
+            if p.is_alive():
+                p.terminate()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Multi-camera screen tracker")
+    parser.add_argument("--cam", action="append", nargs="+", required=True,
+                        metavar=("URL", "CALIB"),
+                        help="stream URL (or .mjpg archive) and optional calibration file")
+    parser.add_argument("--no-gesture", action="store_true")
+    parser.add_argument("--no-pin", action="store_true")
+    parser.add_argument("--hands", default="mediapipe", choices=["mediapipe", "skin"],
+                        help="hand backend (skin: contour tracker for weak CPUs)")
+    args = parser.parse_args()
+
+    cameras = []
+    for cam in args.cam:
+        if len(cam) > 2:
+            parser.error("--cam takes a URL and at most one calibration file")
+        # No calibration for this camera → no undistortion
+        cameras.append((cam[0], cam[1] if len(cam) > 1 else None))
+
+    supervisor = MultiCameraSupervisor(
+        cameras, gestures=not args.no_gesture, pin=not args.no_pin, hands=args.hands
+    ).start()
+
+    print(f"Tracking {len(cameras)} camera(s). Ctrl+C to stop.\n")
+
+    try:
+        for msg in supervisor:
+            if msg["type"] == "stats":
+                supervisor.report()
+            elif msg["type"] in ("result", "gesture"):
+                # Merged output stream: one JSON object per line
+                print(json.dumps(msg))
+            else:
+                print(msg)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        supervisor.stop()
+        supervisor.report()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,4 @@
 import cv2
-import numpy as np
 import time
 import sys
 import os
@@ -8,235 +7,264 @@ PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
 sys.path.append(PROJECT_ROOT)
 
 from model.corners import (
-    detect_edges,
-    filter_lines,
-    extend_segment,
-    intersect,
-    extract_corners_from_points,
+    scale_params,
+    CornerDetector,
     refine_corners_harris,
     draw_corners,
 )
-from model.calibration_data import load_calibration
-from model.hand_gesture import HandGestureController
-
-try:
-    from pynput.keyboard import Controller, Key
-    keyboard = Controller()
-except ImportError:
-    keyboard = None
-    print("⚠ pynput not installed. Gestures will only be printed, not sent to OS.")
-
-# Hand gesture controller
-gesture = HandGestureController()
+from model.undistort import Undistorter
+from model.hand_gesture import HandGestureController, GestureWorker, MotionGate
+from model.tracking import ROITracker, QuadKalman, DetectionScheduler, FlowTracker
+from model.frame import FrameContext
+from utils.stream import LatestFrameGrabber, QualityController
+from utils.actions import ActionDispatcher, NullBackend
 
 # CONFIG
 
 STREAM_URL = "http://192.168.4.35/high-quality-stream"
 CALIB_PATH = "../data/CALI/calibration/calibration_data_opt.npz"
 
-SMOOTH_ALPHA = 0.25   # temporal smoothing for screen corners
-
-
-# Temporal smoother
-
-class CornerSmoother:
-    def __init__(self, alpha=0.25):
-        self.alpha = alpha
-        self.prev = None
-
-    def smooth(self, corners):
-        """
-        corners: list of (x,y) points, e.g. [TL,TR,BR,BL]
-        """
-        corners = np.array(corners, float)
-
-        if self.prev is None:
-            self.prev = corners
-            return corners
-
-        smoothed = self.alpha * corners + (1 - self.alpha) * self.prev
-        self.prev = smoothed
-        return smoothed
-
-
-from pynput.keyboard import Key
-from pynput.mouse import Controller as MouseController
-
-def switch_app(direction):
-    """
-    direction: 'left' or 'right'
-    Performs Cmd+Tab and then Arrow Left/Right while Cmd is still held.
-    """
+DETECT_EVERY = 4          # full detection every N frames, Kalman prediction between
+MAX_INNOVATION = 12.0     # px; larger detection/flow-vs-prediction jumps re-detect next frame
+ACCEL_STD = 400.0         # px/s^2, constant-velocity model process noise
+MEAS_STD = 1.5            # px, detection noise
 
-    # Hold ⌘
-    keyboard.press(Key.cmd)
+CORNER_FLOW = True        # carry corners with LK flow between detections
+FLOW_REDETECT_EVERY = 30  # with flow, re-detect only on flow failure or this often
 
-    # Switcher opens only when Tab is pressed WHILE Cmd is held
-    keyboard.press(Key.tab)
-    keyboard.release(Key.tab)
+ADAPTIVE_QUALITY = True   # step between low/high/ultra streams automatically
+MAX_LATENCY = 0.15        # seconds, capture → displayed result
+MIN_FPS = 8.0
 
-    # VERY IMPORTANT: tiny delay helps macOS register switcher
-    time.sleep(0.05)
+ROI_TRACKING = True       # after a lock, search only bands around the last quad
+ROI_BAND = 16             # band half-width in px (SVGA reference)
 
-    # Move left or right inside app switcher
-    if direction == "left":
-        keyboard.press(Key.left)
-        keyboard.release(Key.left)
-        print("⬅ Cmd+Tab → Move Left")
+MIN_SUPPORT = 0.25        # reject quads whose weakest side has less line support
+                          # than this fraction of its length
 
-    elif direction == "right":
-        keyboard.press(Key.right)
-        keyboard.release(Key.right)
-        print("➡ Cmd+Tab → Move Right")
+PYRAMID_MIN_WIDTH = None  # at/above this width detect coarse-to-fine (None: off).
+                          # Off until the coarse pass picks the same quad as
+                          # full-res on real scenes: on the recorded desk session
+                          # it is off by 12-600 px (python analysis/benchmark.py
+                          # <archive> --pyramid)
+PYRAMID_LEVEL = 2         # downscale factor for the coarse pass
 
-    # Release ⌘ **AFTER** arrow navigation
-    keyboard.release(Key.cmd)
+UNDISTORT = True          # report the screen corners lens-corrected (points only)
+SHOW_RECTIFIED = False    # display the undistorted frame (cached remap tables)
+                          # with the lens-corrected corners; off: raw frame, raw corners
 
-mouse = MouseController()
+STATS_INTERVAL = 5.0      # seconds between corner / gesture rate reports
 
-def handle_gesture(direction):
-    print(f"🤚 Gesture detected: {direction}")
+HAND_BACKEND = "mediapipe"  # "mediapipe", "skin" (cheap CPU fallback) or "fake"
+MOTION_GATE = True        # hand backend idles until the screen crop shows motion
+GESTURE_HOLD = 1.0        # s of full-rate inference after the last motion / hand
+IDLE_EVERY = 10           # while idle, still run the backend on every Nth frame
 
-    if keyboard is None:
-        print("Keyboard unavailable")
-        return
+SEND_ACTIONS = True       # False: recognise gestures only (headless benchmarking)
+SWITCH_INTERVAL = 0.6     # s, minimum gap between two app switches
 
-    # --- SCROLL UP ---
-    if direction == "up":
-        for _ in range(10):          # smooth effect
-            mouse.scroll(0, 20)
-
-    # --- SCROLL DOWN ---
-    elif direction == "down":
-        for _ in range(10):
-            mouse.scroll(0, -20)
-
-    if direction == "left":
-        switch_app("left")
-        return
-
-    elif direction == "right":
-        switch_app("right")
-        return
 
 
 # MAIN LOOP
 
-def main():
-
-    # Load optimized intrinsics (we don't modify them here, just use them if needed)
-    K, dist, *_ = load_calibration(CALIB_PATH)
-    K = K.astype(np.float64)
-    dist = dist.astype(np.float64)
-
-    smoother = CornerSmoother(alpha=SMOOTH_ALPHA)
-
-    # Open ESP32 stream
-    cap = cv2.VideoCapture(STREAM_URL)
-    if not cap.isOpened():
+def main(source=STREAM_URL):
+
+    # Optimized intrinsics: detection runs on the raw frame, and only the
+    # resulting points are undistorted (K rescaled to the stream resolution)
+    undistorter = Undistorter.from_file(CALIB_PATH) if UNDISTORT else None
+
+    # Constant-velocity Kalman filter over the quad: detections are its
+    # measurements, and between scheduled detections its prediction is used
+    kalman = QuadKalman(accel_std=ACCEL_STD, meas_std=MEAS_STD)
+    scheduler = DetectionScheduler(
+        every=FLOW_REDETECT_EVERY if CORNER_FLOW else DETECT_EVERY,
+        max_innovation=MAX_INNOVATION,
+    )
+
+    # Optional LK propagation of the refined corners between detections
+    flow = FlowTracker() if CORNER_FLOW else None
+
+    def on_lock(corners):
+        print("🔒 Screen locked — tracking in edge bands")
+
+    def reset_tracking():
+        kalman.reset()
+        scheduler.reset()
+        if flow is not None:
+            flow.clear()
+
+    def on_loss():
+        print("🔓 Screen lost — back to full-frame detection")
+        reset_tracking()
+
+    # Full-frame Canny → Hough → classify → merge → intersect → select
+    # (coarse-to-fine when PYRAMID_MIN_WIDTH is set). refine=None: STEP 7
+    # below is the one refinement for both the full-frame and the ROI path
+    detector = CornerDetector(refine=None, min_support=MIN_SUPPORT,
+                              pyramid_min_width=PYRAMID_MIN_WIDTH,
+                              pyramid_level=PYRAMID_LEVEL)
+
+    roi = ROITracker(band=ROI_BAND,
+                     full_detect=lambda img: detector.detect(img).corners,
+                     on_lock=on_lock, on_loss=on_loss)
+
+    # Open ESP32 stream (native MJPEG parser on a background thread,
+    # newest frame only, decoded on demand)
+    grabber = LatestFrameGrabber(source, native=True)
+    if not grabber.isOpened():
         raise RuntimeError("Cannot open ESP32 stream.")
-    
-    print("Streaming from:", STREAM_URL)
-    print("Press Q to quit.\n")
-
-    while True:
-        ret, frame = cap.read()
-        if not ret:
-            print("⚠ Failed frame read.")
-            time.sleep(0.03)
-            continue
+    grabber.start()
 
-        img = frame.copy()
-
-        # STEP 1 — Edge detection
-        edges = detect_edges(img)
-
-        # STEP 2 — Hough lines
-        lines = cv2.HoughLinesP(
-            edges,
-            rho=1,
-            theta=np.pi/180,
-            threshold=80,
-            minLineLength=0.15 * img.shape[1],
-            maxLineGap=25
+    # Adaptive quality only applies to the firmware's stream endpoints
+    quality = None
+    if ADAPTIVE_QUALITY:
+        quality = QualityController.from_url(
+            source, max_latency=MAX_LATENCY, min_fps=MIN_FPS
         )
 
-        if lines is None:
-            # Still run gesture detection on the raw frame
-            direction = gesture.detect_gesture(frame)
-            if direction is not None:
-                handle_gesture(direction)
-
-            cv2.imshow("ESP32 Tracker", img)
-            if cv2.waitKey(1) & 0xFF == ord('q'):
-                break
-            continue
-
-        flat_lines = [tuple(line[0]) for line in lines]
-
-        # STEP 3 — Filter to vertical/horizontal
-        horizontal, vertical = filter_lines(flat_lines, img)
+    # Hand gesture controller; the backend model is built here, so a
+    # missing one fails at startup, and inference runs on the worker's
+    # own thread at its own rate
+    gesture = HandGestureController(
+        backend=HAND_BACKEND,
+        gate=MotionGate(hold=GESTURE_HOLD, idle_every=IDLE_EVERY) if MOTION_GATE else None,
+    )
+    print("Hand backend:", gesture.backend.name)
+    gestures = GestureWorker(gesture).start()
+
+    # Scrolls / app switches run on the dispatcher's thread, never this one
+    actions = ActionDispatcher(
+        backend=None if SEND_ACTIONS else NullBackend(),
+        switch_interval=SWITCH_INTERVAL,
+    ).start()
+
+    print("Streaming from:", source)
+    print("Press Q to quit.\n")
 
-        if len(horizontal) < 2 or len(vertical) < 2:
-            direction = gesture.detect_gesture(img)
-            if direction is not None:
-                handle_gesture(direction)
+    # Gray / blur / edge images of every frame go into the same arrays
+    frame_buffers = {}
 
-            cv2.imshow("ESP32 Tracker", img)
-            if cv2.waitKey(1) & 0xFF == ord('q'):
-                break
-            continue
+    frame_ts = None
+    screen = None             # tracker output: screen corners, lens-corrected
+    corner_frames = 0
+    t_start = last_report = time.time()
 
-        # STEP 4 — Extend lines to full-image
-        H, W = img.shape[:2]
-        ext_h = [extend_segment(*h, W, H) for h in horizontal]
-        ext_v = [extend_segment(*v, W, H) for v in vertical]
-
-        # STEP 5 — Compute intersections
-        all_points = []
-        for hx1, hy1, hx2, hy2 in ext_h:
-            for vx1, vy1, vx2, vy2 in ext_v:
-                p = intersect(hx1, hy1, hx2, hy2, vx1, vy1, vx2, vy2)
-                if p is not None:
-                    all_points.append(p)
-
-        if len(all_points) < 4:
-            direction = gesture.detect_gesture(img)
-            if direction is not None:
-                handle_gesture(direction)
-
-            cv2.imshow("ESP32 Tracker", img)
-            if cv2.waitKey(1) & 0xFF == ord('q'):
+    while True:
+        # End-to-end latency of the previous frame (capture → shown)
+        if frame_ts is not None and quality is not None:
+            if quality.update(time.time() - frame_ts):
+                grabber.release()
+                try:
+                    grabber = LatestFrameGrabber(quality.url, native=True).start()
+                except RuntimeError as e:
+                    # The new level did not open: back to the previous one
+                    print(f"✖ {e}")
+                    quality.failed()
+                    grabber = LatestFrameGrabber(quality.url, native=True).start()
+
+                # New frame size: the quad, its velocity, the flow points and
+                # the ROI bands are all in the old stream's pixels
+                if roi.locked:
+                    roi.unlock()
+                reset_tracking()
+        frame_ts = None
+
+        ret, frame = grabber.read_latest()
+        if not ret:
+            # End of a replayed archive
+            if grabber.finished:
                 break
-            continue
-
-        # STEP 6 — Choose TL, TR, BR, BL
-        corners = extract_corners_from_points(all_points)
-        if corners is None:
-            direction = gesture.detect_gesture(frame)
-            if direction is not None:
-                handle_gesture(direction)
-
-            cv2.imshow("ESP32 Tracker", img)
+            # No new frame yet — keep the window responsive and poll again
             if cv2.waitKey(1) & 0xFF == ord('q'):
                 break
             continue
 
-        TL, TR, BR, BL = corners
-
-        # STEP 7 — Harris refinement (local)
-        refined = refine_corners_harris(img, [TL, TR, BR, BL], search=4)
-
-        # STEP 8 — Temporal smoothing
-        smoothed = smoother.smooth(refined)
-
-        # STEP 9 — Hand gesture detection (on full frame)
-        direction = gesture.detect_gesture(frame)
-        if direction is not None:
-            handle_gesture(direction)
-
-        # STEP 10 — Draw final 4 corners
-        vis = draw_corners(img.copy(), smoothed, color=(0, 255, 0), radius=10)
+        frame_ts = grabber.timestamp
+
+        # One context per frame: gray / blur / edges / RGB computed at most once
+        ctx = FrameContext(frame, frame_buffers)
+        params = scale_params(frame.shape[1])
+
+        corner_frames += 1
+        now = time.time()
+        if now - last_report >= STATS_INTERVAL:
+            g = gestures.stats()
+            print(f"Corners {corner_frames / (now - t_start):5.1f} fps | "
+                  f"gestures {g['fps']:5.1f} fps ({g['latency_ms']:.0f} ms behind) | "
+                  f"screen {None if screen is None else [(round(x), round(y)) for x, y in screen]}")
+            last_report = now
+
+        # STEP 0 — Predict the quad at this frame's capture time
+        predicted = kalman.predict(frame_ts)
+
+        smoothed = None
+        if predicted is not None and not scheduler.should_detect():
+            # Between detections: LK flow measures the corners (falling
+            # through to a detection when it fails), or the prediction
+            # stands in for STEP 1-8. A flow jump larger than
+            # MAX_INNOVATION re-detects on the next frame
+            innovation = None
+            if flow is None:
+                smoothed = predicted
+            else:
+                tracked = flow.track(ctx)
+                if tracked is not None:
+                    innovation = kalman.innovation(tracked)
+                    smoothed = kalman.update(tracked, frame_ts)
+
+            if smoothed is not None:
+                scheduler.predicted(innovation)
+
+        if smoothed is None:
+            # STEP 1-6 — Screen corners: ROI bands around the predicted quad
+            # while locked, full-frame Canny/Hough/intersection otherwise
+            corners = roi.update(ctx, predicted if ROI_TRACKING else None)
+
+            if corners is not None:
+                # STEP 7 — Harris refinement (local, full resolution; its
+                # window also covers the pyramid's one low-res pixel)
+                refined = refine_corners_harris(ctx, corners, search=params["search"])
+
+                # STEP 8 — Kalman measurement update
+                scheduler.detected(kalman.innovation(refined))
+                smoothed = kalman.update(refined, frame_ts)
+
+                if flow is not None:
+                    flow.seed(ctx, refined)
+            else:
+                scheduler.detected(None)
+
+        # STEP 9 — Hand gestures: the worker gets its own copy of the crop
+        # around the tracked quad (raw pixel coordinates; MediaPipe only
+        # sees that crop), so ctx and frame stay on this thread; act on
+        # any finished results
+        gestures.submit(ctx, frame_ts, box=smoothed)
+        for direction, _ in gestures.poll():
+            print(f"🤚 Gesture detected: {direction}")
+            actions.dispatch(direction)
+
+        # STEP 10 — Lens correction on the 4 corners only: with a
+        # calibration loaded, the tracker's output is the undistorted quad
+        screen = smoothed
+        if smoothed is not None and undistorter is not None:
+            screen = undistorter.undistort_points(smoothed, frame.shape)
+
+        # STEP 11 — Draw the final 4 corners and the newest fingertip
+        # (draw_corners makes the only copy): undistorted points on the
+        # rectified frame, raw points on the raw one
+        fingertip = gestures.fingertip
+        vis = frame
+        if SHOW_RECTIFIED and undistorter is not None:
+            vis = undistorter.rectify(frame)
+            points = [] if screen is None else list(screen)
+            if fingertip is not None:
+                points += list(undistorter.undistort_points([fingertip], frame.shape))
+        else:
+            points = [] if smoothed is None else list(smoothed)
+            if fingertip is not None:
+                points.append(fingertip)
+        if points:
+            vis = draw_corners(vis, points, color=(0, 255, 0), radius=10)
 
         cv2.imshow("ESP32 Tracker", vis)
 
@@ -244,9 +272,24 @@ def main():
         if cv2.waitKey(1) & 0xFF == ord('q'):
             break
 
-    cap.release()
+    gestures.stop()
+    actions.stop()
+
+    elapsed = max(time.time() - t_start, 1e-6)
+    print(f"Corner loop: {corner_frames} frames, {corner_frames / elapsed:.1f} fps")
+    print(f"Gesture worker: {gestures.stats()}")
+    print(f"Actions: {actions.stats()}")
+    print(f"Frames dropped (stale): {grabber.dropped} / {grabber.grabbed}")
+    print(f"ROI tracking: {roi.stats()}")
+    print("Full detection, mean ms/frame per stage:",
+          {k: round(v, 2) for k, v in detector.stage_report().items()})
+    print(f"Detection schedule: {scheduler.stats()}")
+    if flow is not None:
+        print(f"Corner flow: {flow.stats()}")
+    grabber.release()
     cv2.destroyAllWindows()
 
 
 if __name__ == "__main__":
-    main()
+    # Optional argument: stream URL or recorded .mjpg archive to replay
+    main(sys.argv[1] if len(sys.argv) > 1 else STREAM_URL)
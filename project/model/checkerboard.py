@@ -14,6 +14,8 @@ import cv2
 import glob
 import os
 
+from model.corner_cache import CornerCache, cached_corners
+
 
 # 1. Normalize extrinsics (rvecs, tvecs)
 def normalize_extrinsics(rvecs_raw, tvecs_raw):
@@ -42,26 +44,31 @@ def build_checkerboard(CHECKERBOARD=(9, 6), square_size=2.5):
 
 
 # 3. Extract objpoints/imgpoints from image directory
-def extract_checkerboard_points(image_glob_path, CHECKERBOARD=(9, 6), square_size=2.5):
+def extract_checkerboard_points(image_glob_path, CHECKERBOARD=(9, 6), square_size=2.5,
+                                use_cache=True):
+    """
+    Raw (not sub-pixel refined) corners of every image with a board, in
+    sorted file order like gen_cali. Corners already found by cali_cam or
+    gen_cali come from the corner cache next to the images.
+    """
     objp = build_checkerboard(CHECKERBOARD, square_size)
+    cache = CornerCache.for_images(image_glob_path) if use_cache else None
 
     objpoints = []
     imgpoints = []
 
-    images = glob.glob(image_glob_path)
+    images = sorted(glob.glob(image_glob_path))
 
     for fname in images:
-        img = cv2.imread(fname)
-        if img is None:
-            continue
-
-        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-        found, corners = cv2.findChessboardCorners(gray, CHECKERBOARD)
+        found, size, corners, _ = cached_corners(fname, CHECKERBOARD, cache)
 
         if found:
             objpoints.append(objp)
             imgpoints.append(corners)
 
+    if cache is not None:
+        cache.save()
+
     return objpoints, imgpoints
 
 
@@ -0,0 +1,171 @@
+"""
+corner_cache.py
+
+Persistent chessboard-corner store shared by the calibration stages
+(setup/cali_cam.py, setup/gen_cali.py, model/checkerboard.py):
+    - detect_corners(gray, pattern) : the one detection recipe every stage
+      uses (findChessboardCorners + refine_corners / cornerSubPix)
+    - content_hash / file_hash / decode_gray : cache keys and decoding
+    - CornerCache : sidecar .npz next to the images, keyed by image content
+      hash and pattern size, holding the found flag, image size, raw and
+      sub-pixel corners
+    - cached_corners(fname, pattern, cache) : cache hit or detect + store
+
+Whichever stage sees an image first stores its corners; the others skip
+detection. Keys are content hashes, so renamed or moved images still hit
+and edited images miss.
+"""
+
+import hashlib
+import os
+
+import cv2
+import numpy as np
+
+
+CACHE_NAME = "chessboard_corners.npz"
+
+SUBPIX_WIN = (11, 11)
+SUBPIX_CRITERIA = (cv2.TERM_CRITERIA_EPS + cv2.TERM_CRITERIA_MAX_ITER, 30, 0.001)
+
+
+def content_hash(data):
+    """sha1 hex digest of raw image bytes."""
+    return hashlib.sha1(bytes(data)).hexdigest()
+
+
+def file_hash(fname):
+    with open(fname, "rb") as f:
+        return content_hash(f.read())
+
+
+def decode_gray(data):
+    """
+    Encoded image bytes → gray, decoded in colour then converted exactly
+    like the live frames in cali_cam, so every stage sees the same pixels.
+    """
+    img = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+    if img is None:
+        return None
+    return cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+
+
+def detect_corners(gray, pattern):
+    """Returns (found, raw (N,1,2) or None, subpix (N,1,2) or None)."""
+    found, raw = cv2.findChessboardCorners(gray, tuple(pattern), None)
+    if not found:
+        return False, None, None
+
+    return True, raw, refine_corners(gray, raw)
+
+
+def refine_corners(gray, raw):
+    """Sub-pixel corners; raw is left untouched (cornerSubPix works in place)."""
+    return cv2.cornerSubPix(gray, raw.copy(), SUBPIX_WIN, (-1, -1), SUBPIX_CRITERIA)
+
+
+class CornerCache:
+    def __init__(self, path):
+        self.path = path
+        self.entries = {}   # key → (found, size, raw, sub)
+        self.hits = 0
+        self.misses = 0
+        self._dirty = False
+
+        if os.path.isfile(path):
+            self._load()
+
+    @classmethod
+    def for_images(cls, image_glob_or_dir):
+        """Cache file in the image directory."""
+        folder = image_glob_or_dir
+        if not os.path.isdir(folder):
+            folder = os.path.dirname(image_glob_or_dir)
+        return cls(os.path.join(folder, CACHE_NAME))
+
+    @staticmethod
+    def key(digest, pattern):
+        return f"{digest}_{pattern[0]}x{pattern[1]}"
+
+    def _load(self):
+        try:
+            data = np.load(self.path)
+        except (OSError, ValueError):
+            return   # unreadable cache: start over
+
+        with data:
+            for name in data.files:
+                if not name.endswith(".found"):
+                    continue
+                key = name[:-len(".found")]
+                found = bool(data[name])
+                self.entries[key] = (
+                    found,
+                    tuple(int(v) for v in data[key + ".size"]),
+                    data[key + ".raw"] if found else None,
+                    data[key + ".sub"] if found else None,
+                )
+
+    def get(self, digest, pattern):
+        entry = self.entries.get(self.key(digest, pattern))
+        if entry is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return entry
+
+    def put(self, digest, pattern, found, size, raw=None, sub=None):
+        self.entries[self.key(digest, pattern)] = (
+            bool(found), tuple(int(v) for v in size),
+            None if raw is None else np.asarray(raw, np.float32),
+            None if sub is None else np.asarray(sub, np.float32),
+        )
+        self._dirty = True
+
+    def save(self):
+        if not self._dirty:
+            return
+
+        empty = np.empty((0, 1, 2), np.float32)
+        arrays = {}
+        for key, (found, size, raw, sub) in self.entries.items():
+            arrays[key + ".found"] = np.array(found)
+            arrays[key + ".size"] = np.array(size, np.int32)
+            arrays[key + ".raw"] = empty if raw is None else raw
+            arrays[key + ".sub"] = empty if sub is None else sub
+
+        folder = os.path.dirname(self.path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+
+        # Write-then-rename, so a crash never leaves a truncated cache
+        tmp = self.path + ".tmp.npz"
+        np.savez(tmp, **arrays)
+        os.replace(tmp, self.path)
+        self._dirty = False
+
+
+def cached_corners(fname, pattern, cache=None):
+    """
+    (found, size, raw, sub) for one image file, from the cache when the
+    same bytes were seen before. size is None if the image is unreadable.
+    """
+    with open(fname, "rb") as f:
+        data = f.read()
+    digest = content_hash(data)
+
+    if cache is not None:
+        entry = cache.get(digest, pattern)
+        if entry is not None:
+            return entry
+
+    gray = decode_gray(data)
+    if gray is None:
+        return False, None, None, None
+
+    size = gray.shape[::-1]
+    found, raw, sub = detect_corners(gray, pattern)
+
+    if cache is not None:
+        cache.put(digest, pattern, found, size, raw, sub)
+    return found, size, raw, sub
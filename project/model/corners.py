@@ -2,24 +2,68 @@
 corners.py
 
 Reusable definitions for:
+    - Resolution-dependent detection parameters
     - Canny edge detection
-    - Hough line detection
-    - Line filtering (orientation + length)
+    - Hough line detection, with pluggable line backends (HoughLinesP,
+      angle-restricted standard Hough, LSD)
+    - Line filtering (orientation + length), vectorized
+    - Merging near-duplicate (collinear) lines with support weights, and
+      the support of each side of a detected quad
     - Extending lines to image borders
-    - Computing intersections between lines
+    - Computing intersections between lines (batched, homogeneous)
     - Extracting 4 geometric corners (TL, TR, BR, BL)
+    - Coarse-to-fine (pyramid) detection for high-resolution frames
+    - CornerDetector : the whole pipeline as one engine with pluggable
+      stages, reused buffers and per-stage timings
+
+Every image argument may also be a model.frame.FrameContext, in which case
+gray / blurred / edge images are shared with the other stages of the frame.
 """
 
+import time
+
 import cv2
 import numpy as np
-import math
+
+from model.frame import FrameContext, as_bgr, gray_patch
+
+
+# ============================================================
+# 0. Resolution-dependent parameters
+# ============================================================
+# Pixel-valued parameters below were tuned on the SVGA (800px) stream
+REF_WIDTH = 800
+
+
+def scale_params(width, ref_width=REF_WIDTH):
+    """
+    Detection parameters rescaled from the reference width, so results
+    stay consistent when the stream resolution changes.
+    """
+    s = width / float(ref_width)
+
+    return {
+        # Canny thresholds are absolute gradients, and a wider blur lowers
+        # them ∝ 1/sigma, so the blur kernel stays fixed
+        "blur": 5,
+        # Votes per (rho, theta) bin are capped by the 1° angle quantisation
+        # on long, slightly tilted edges, so only scale the threshold down
+        "threshold": max(20, int(round(80 * min(s, 1.0)))),
+        "min_frac": 0.15,                           # already relative to W
+        "max_gap": max(5, int(round(25 * s))),
+        "search": max(2, int(round(4 * s))),        # Harris window half-size
+        "merge_offset": 8.0 * s,                    # collinear merge, px
+    }
 
 
 # ============================================================
 # 1. Canny detector
 # ============================================================
 def detect_edges(img, blur=5, low=50, high=150):
-    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+    if isinstance(img, FrameContext):
+        return img.edges(blur, low, high)
+
+    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY) if img.ndim == 3 else img
     if blur > 0:
         gray = cv2.GaussianBlur(gray, (blur, blur), 0)
     edges = cv2.Canny(gray, low, high)
@@ -29,16 +73,21 @@ def detect_edges(img, blur=5, low=50, high=150):
 # ============================================================
 # 2. Detect Hough lines
 # ============================================================
-def detect_hough_lines(edges, img_shape,
-                       threshold=80,
-                       min_frac=0.15,
-                       max_gap=25):
-
+def hough_segments(edges, img_shape,
+                   threshold=80,
+                   min_frac=0.15,
+                   max_gap=25,
+                   min_len=None):
+    """
+    Raw cv2.HoughLinesP output: (N,1,4) int array, or None.
+    Segments must be min_frac of the image width long, or min_len px.
+    """
     H, W = img_shape[:2]
 
-    min_len = min_frac * W
+    if min_len is None:
+        min_len = min_frac * W
 
-    lines = cv2.HoughLinesP(
+    return cv2.HoughLinesP(
         edges,
         rho=1,
         theta=np.pi / 180,
@@ -47,40 +96,225 @@ def detect_hough_lines(edges, img_shape,
         maxLineGap=max_gap
     )
 
+
+def detect_hough_lines(edges, img_shape,
+                       threshold=80,
+                       min_frac=0.15,
+                       max_gap=25):
+
+    lines = hough_segments(edges, img_shape, threshold, min_frac, max_gap)
+
     if lines is None:
         return []
 
     return [tuple(line[0]) for line in lines]
 
 
+# ------------------------------------------------------------
+# 2b. Line backends: fn(source, img_shape, params) -> (N,4) segments.
+#     `source` is the Canny image, or the gray image for backends
+#     with uses_edges = False (the edge stage is then skipped).
+# ------------------------------------------------------------
+def lines_houghp(edges, img_shape, params):
+    """Probabilistic Hough over the full 180° (the original detector)."""
+    raw = hough_segments(edges, img_shape,
+                         threshold=params["threshold"],
+                         min_frac=params["min_frac"],
+                         max_gap=params["max_gap"])
+    if raw is None:
+        return np.empty((0, 4), np.int32)
+    return raw.reshape(-1, 4)
+
+
+def lines_hough_bands(edges, img_shape, params, band=10, max_lines=40):
+    """
+    Standard cv2.HoughLines with the accumulator restricted to the two
+    angle bands classify_lines keeps (±band° around horizontal and
+    vertical), i.e. 2·band of the 180 theta bins. Each infinite line is
+    returned as a segment across the image; votes count edge pixels along
+    the whole line, so the threshold is the minimum segment length.
+    """
+    H, W = img_shape[:2]
+    b = np.radians(band)
+    step = np.pi / 180
+    threshold = max(params["threshold"], int(params["min_frac"] * W))
+
+    found = []
+    for lo, hi in ((np.pi / 2 - b, np.pi / 2 + b),   # horizontal (normal ≈ 90°)
+                   (0.0, b),                          # vertical, normal ≈ 0°
+                   (np.pi - b, np.pi)):               # vertical, normal ≈ 180°
+        res = cv2.HoughLines(edges, 1, step, threshold,
+                             min_theta=lo, max_theta=hi)
+        if res is not None:
+            found.append(res[:max_lines, 0])          # strongest first
+
+    if not found:
+        return np.empty((0, 4), np.float64)
+
+    rho, theta = np.concatenate(found).T
+    c, s = np.cos(theta), np.sin(theta)
+
+    # x·cos + y·sin = rho, spanned across the image along its major axis
+    horiz = np.abs(s) > np.abs(c)
+    seg = np.empty((len(rho), 4), np.float64)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        seg[:, 0] = np.where(horiz, 0.0, rho / c)
+        seg[:, 1] = np.where(horiz, rho / s, 0.0)
+        seg[:, 2] = np.where(horiz, W, (rho - H * s) / c)
+        seg[:, 3] = np.where(horiz, (rho - W * c) / s, H)
+    return seg
+
+
+_LSD = None
+
+
+def lines_lsd(gray, img_shape, params):
+    """OpenCV's line segment detector, run on the gray image (no Canny)."""
+    global _LSD
+    if _LSD is None:
+        if not hasattr(cv2, "createLineSegmentDetector"):
+            raise RuntimeError("This OpenCV build has no line segment detector")
+        _LSD = cv2.createLineSegmentDetector(cv2.LSD_REFINE_STD)
+
+    seg = _LSD.detect(gray)[0]
+    if seg is None:
+        return np.empty((0, 4), np.float64)
+    seg = seg.reshape(-1, 4).astype(np.float64)
+
+    # LSD orients each segment along its gradient, so one horizontal edge
+    # of a bright screen comes back right-to-left (angle ≈ ±180°); point
+    # them all left-to-right like HoughLinesP does
+    flip = seg[:, 2] < seg[:, 0]
+    seg[flip] = seg[flip][:, [2, 3, 0, 1]]
+    return seg
+
+
+lines_lsd.uses_edges = False
+
+LINE_BACKENDS = {
+    "houghp": lines_houghp,
+    "hough": lines_hough_bands,
+    "lsd": lines_lsd,
+}
+
+
 # ============================================================
 # 3. Filter lines by orientation
 # ============================================================
-def filter_lines(lines, img, vertical_thresh=10, horizontal_thresh=10):
-    H, W = img.shape[:2]
+def classify_lines(lines, img_shape, vertical_thresh=10, horizontal_thresh=10):
+    """
+    Vectorized orientation + length filter.
+
+    lines: raw (N,1,4) array from cv2.HoughLinesP, (N,4) array or list of
+           (x1,y1,x2,y2) tuples
+    Returns (horizontal (Nh,4), vertical (Nv,4), h_mask (N,), v_mask (N,))
+    with the float segments and boolean masks into the input order.
+    """
+    H, W = img_shape[:2]
+
+    if lines is None or len(lines) == 0:
+        empty = np.empty((0, 4), np.float64)
+        none = np.zeros(0, bool)
+        return empty, empty, none, none
 
-    horizontal = []
-    vertical = []
+    seg = np.asarray(lines, dtype=np.float64).reshape(-1, 4)
 
-    for line in lines:
+    dx = seg[:, 2] - seg[:, 0]
+    dy = seg[:, 3] - seg[:, 1]
 
-        x1, y1, x2, y2 = map(float, line)
+    angle = np.degrees(np.arctan2(dy, dx))
+    length = np.hypot(dx, dy)
 
-        dx = x2 - x1
-        dy = y2 - y1
+    # vertical wins when both tests pass, as in the per-segment loop
+    v_mask = (np.abs(np.abs(angle) - 90) < vertical_thresh) & (length > H * 0.1)
+    h_mask = (~v_mask) & (np.abs(angle) < horizontal_thresh) & (length > W * 0.1)
 
-        angle = math.degrees(math.atan2(dy, dx))
-        length = math.hypot(dx, dy)
+    return seg[h_mask], seg[v_mask], h_mask, v_mask
 
-        # ---------- vertical ----------
-        if abs(abs(angle) - 90) < vertical_thresh and length > H * 0.1:
-            vertical.append((x1, y1, x2, y2))
 
-        # ---------- horizontal ----------
-        elif abs(angle) < horizontal_thresh and length > W * 0.1:
-            horizontal.append((x1, y1, x2, y2))
+def filter_lines(lines, img, vertical_thresh=10, horizontal_thresh=10):
+    horizontal, vertical, _, _ = classify_lines(
+        lines, img.shape, vertical_thresh, horizontal_thresh
+    )
+
+    return ([tuple(l) for l in horizontal.tolist()],
+            [tuple(l) for l in vertical.tolist()])
+
+
+# ============================================================
+# 3b. Merge near-duplicate lines (cluster by angle / offset)
+# ============================================================
+def merge_lines(segments, angle_tol=2.0, offset_tol=8.0):
+    """
+    Clusters segments of one orientation class by direction angle and
+    normal offset (theta / rho) and merges each cluster into a single
+    length-weighted representative segment.
 
-    return horizontal, vertical
+    Returns (merged (M,4) float array, weights (M,) summed segment length).
+    The weights are the support of each merged line; CornerDetector checks
+    the sides of the detected quad against them (quad_support).
+    """
+    seg = np.asarray(segments, dtype=np.float64).reshape(-1, 4)
+    if len(seg) == 0:
+        return np.empty((0, 4), np.float64), np.empty(0, np.float64)
+
+    dx = seg[:, 2] - seg[:, 0]
+    dy = seg[:, 3] - seg[:, 1]
+    length = np.hypot(dx, dy)
+
+    # Orient every segment the same way (dominant component positive), so
+    # angles of one class never wrap around ±180°
+    flip = np.where(np.abs(dx) >= np.abs(dy), dx < 0, dy < 0)
+    dx = np.where(flip, -dx, dx)
+    dy = np.where(flip, -dy, dy)
+
+    phi = np.arctan2(dy, dx)
+
+    # Offsets are measured from the centroid of the segments, so a small
+    # angle difference cannot hide behind a shared far-away origin
+    c = seg.reshape(-1, 2, 2).mean(axis=(0, 1))
+    rho = -np.sin(phi) * (seg[:, 0] - c[0]) + np.cos(phi) * (seg[:, 1] - c[1])
+
+    # Pass 1: greedy bands along rho, each at most offset_tol wide
+    # (one searchsorted per cluster; no chaining across a whole bezel)
+    order = np.argsort(rho, kind="stable")
+    rho_sorted = rho[order]
+    gap = np.zeros(len(order), bool)
+    i = 0
+    while i < len(order):
+        gap[i] = True
+        i = np.searchsorted(rho_sorted, rho_sorted[i] + offset_tol, side="right")
+    coarse = np.empty(len(order), np.int64)
+    coarse[order] = np.cumsum(gap)
+
+    # Pass 2: split each offset cluster by angle
+    order = np.lexsort((phi, coarse))
+    breaks = np.ones(len(order), bool)
+    breaks[1:] = ((np.diff(coarse[order]) != 0)
+                  | (np.diff(phi[order]) > np.radians(angle_tol)))
+    labels = np.cumsum(breaks) - 1
+    M = labels[-1] + 1
+
+    phi_s, rho_s, len_s = phi[order], rho[order], length[order]
+
+    weights = np.bincount(labels, len_s, minlength=M)
+    w_safe = np.where(weights > 0, weights, 1.0)
+    phi_m = np.bincount(labels, phi_s * len_s, minlength=M) / w_safe
+    rho_m = np.bincount(labels, rho_s * len_s, minlength=M) / w_safe
+
+    # Representative segment spans the extent of its members along the line
+    d = np.stack([np.cos(phi_m), np.sin(phi_m)], axis=1)
+    n = np.stack([-d[:, 1], d[:, 0]], axis=1)
+    p0 = c + rho_m[:, None] * n
+
+    pts = seg[order].reshape(-1, 2, 2) - c
+    t = np.einsum("kij,kj->ki", pts, d[labels])         # (N,2) projections
+    starts = np.flatnonzero(breaks)
+    t_min = np.minimum.reduceat(t.min(axis=1), starts)
+    t_max = np.maximum.reduceat(t.max(axis=1), starts)
+
+    merged = np.hstack([p0 + t_min[:, None] * d, p0 + t_max[:, None] * d])
+    return merged, weights
 
 
 # ============================================================
@@ -126,18 +360,60 @@ def intersect(x1, y1, x2, y2, x3, y3, x4, y4):
 # ============================================================
 # 6. Compute all intersections between vertical/horizontal lines
 # ============================================================
-def compute_intersections(vertical, horizontal):
-    pts = []
+def segments_to_homogeneous(segments):
+    """
+    (N,4) segments → (N,3) homogeneous lines l = p1 × p2, scaled so that
+    (a, b) is a unit normal. Degenerate (zero-length) segments become 0.
+    """
+    seg = np.asarray(segments, dtype=np.float64).reshape(-1, 4)
 
-    for (vx1, vy1, vx2, vy2) in vertical:
-        for (hx1, hy1, hx2, hy2) in horizontal:
-            p = intersect(hx1, hy1, hx2, hy2, vx1, vy1, vx2, vy2)
-            if p is not None:
-                pts.append(p)
+    x1, y1, x2, y2 = seg[:, 0], seg[:, 1], seg[:, 2], seg[:, 3]
+    lines = np.stack([y1 - y2, x2 - x1, x1 * y2 - x2 * y1], axis=1)
+
+    norm = np.hypot(lines[:, 0], lines[:, 1])
+    norm[norm == 0] = np.inf
+    return lines / norm[:, None]
+
+
+def intersect_lines(horizontal, vertical, img_shape=None, margin=0.0,
+                    parallel_eps=1e-6, return_pairs=False):
+    """
+    Every horizontal × vertical intersection with one broadcasted cross
+    product. Lines are infinite, so segments need no extension first.
 
+    Parallel pairs (|sin angle| < parallel_eps) are dropped, and with
+    img_shape given so are points more than `margin` px outside the image.
+    Returns a float (K,2) array, plus (h_idx, v_idx) if return_pairs.
+    """
+    Lh = segments_to_homogeneous(horizontal)
+    Lv = segments_to_homogeneous(vertical)
+
+    P = np.cross(Lh[:, None, :], Lv[None, :, :])      # (Nh, Nv, 3)
+    w = P[..., 2]
+
+    # With unit normals, |w| is the sine of the angle between the lines
+    valid = np.abs(w) > parallel_eps
+    w_safe = np.where(valid, w, 1.0)
+    x = P[..., 0] / w_safe
+    y = P[..., 1] / w_safe
+
+    if img_shape is not None:
+        H, W = img_shape[:2]
+        valid &= (x >= -margin) & (x <= W + margin)
+        valid &= (y >= -margin) & (y <= H + margin)
+
+    h_idx, v_idx = np.nonzero(valid)
+    pts = np.stack([x[h_idx, v_idx], y[h_idx, v_idx]], axis=1)
+
+    if return_pairs:
+        return pts, h_idx, v_idx
     return pts
 
 
+def compute_intersections(vertical, horizontal, img_shape=None):
+    return intersect_lines(horizontal, vertical, img_shape)
+
+
 # ============================================================
 # 7. Extract 4 outermost corners (TL, TR, BR, BL)
 # ============================================================
@@ -161,35 +437,44 @@ def extract_corners_from_points(pts):
     return [TL, TR, BR, BL]
 
 
+def quad_support(corners, horizontal, vertical, h_support, v_support, tol=2.0):
+    """
+    Support of each quad side [top, right, bottom, left] as a fraction of
+    its length: summed merged-line support (see merge_lines) of the lines
+    of the side's class passing within `tol` px of both its corners.
+    """
+    TL, TR, BR, BL = (np.asarray(c, np.float64) for c in corners)
+    sides = [(TL, TR, horizontal, h_support), (TR, BR, vertical, v_support),
+             (BL, BR, horizontal, h_support), (TL, BL, vertical, v_support)]
+
+    out = np.zeros(4)
+    for k, (p, q, lines, weights) in enumerate(sides):
+        if len(lines) == 0:
+            continue
+        L = segments_to_homogeneous(lines)
+        near = ((np.abs(L @ np.append(p, 1.0)) <= tol)
+                & (np.abs(L @ np.append(q, 1.0)) <= tol))
+        out[k] = np.asarray(weights)[near].sum() / max(np.hypot(*(q - p)), 1.0)
+    return out
+
+
 # ============================================================
 # 8. Full pipeline: get 4 corner points from an image
 # ============================================================
 def detect_4_corners(img):
+    """
+    One-shot CornerDetector run (no refinement), in the original tuple form:
+    (corners, edges, lines, v_ext, h_ext, pts).
+    """
     H, W = img.shape[:2]
 
-    # 1. Canny
-    edges = detect_edges(img)
-
-    # 2. Hough lines
-    lines = detect_hough_lines(edges, img.shape)
-
-    if not lines:
-        return None, edges, [], [], [], []
-
-    # 3. Orientation filter
-    vertical, horizontal = filter_lines(lines)
+    result = CornerDetector(refine=None).detect(img)
 
-    # 4. Extend lines to full image borders
-    v_ext = [extend_segment(*v, W, H) for v in vertical]
-    h_ext = [extend_segment(*h, W, H) for h in horizontal]
+    # Lines extended to full image borders (for visualisation)
+    v_ext = [extend_segment(*v, W, H) for v in result.vertical]
+    h_ext = [extend_segment(*h, W, H) for h in result.horizontal]
 
-    # 5. Intersections
-    pts = compute_intersections(v_ext, h_ext)
-
-    # 6. Extract corners
-    corners = extract_corners_from_points(pts)
-
-    return corners, edges, lines, v_ext, h_ext, pts
+    return result.corners, result.edges, result.lines, v_ext, h_ext, result.points
 
 
 # Harris Refinement (local, edge-constrained)
@@ -197,8 +482,9 @@ def refine_corners_harris(image, corners, search=4):
     """
     Refines pre-estimated corner locations using Harris within a very small ROI.
     This prevents drift into screen interior or UI elements.
+    Only the ROIs are converted to gray.
     """
-    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    h, w = image.shape[:2]
     refined = []
 
     for (cx, cy) in corners:
@@ -208,15 +494,15 @@ def refine_corners_harris(image, corners, search=4):
         # Local search window
         x1 = max(cx - search, 0)
         y1 = max(cy - search, 0)
-        x2 = min(cx + search, gray.shape[1] - 1)
-        y2 = min(cy + search, gray.shape[0] - 1)
-
-        roi = gray[y1:y2, x1:x2].astype(np.float32)
+        x2 = min(cx + search, w - 1)
+        y2 = min(cy + search, h - 1)
 
-        if roi.size == 0:
+        if x2 <= x1 or y2 <= y1:
             refined.append((cx, cy))
             continue
 
+        roi = gray_patch(image, y1, y2, x1, x2).astype(np.float32)
+
         H = cv2.cornerHarris(roi, 2, 3, 0.04)
         H = cv2.dilate(H, None)
 
@@ -227,8 +513,296 @@ def refine_corners_harris(image, corners, search=4):
     return refined
 
 
+# Sub-pixel refinement (local ROIs only)
+def refine_corners_subpix(image, corners, win=5, iters=20, eps=0.01):
+    """
+    cv2.cornerSubPix on small patches around each corner. Only the patches
+    are converted to gray, never the whole frame.
+    """
+    criteria = (cv2.TERM_CRITERIA_EPS + cv2.TERM_CRITERIA_MAX_ITER, iters, eps)
+    h, w = image.shape[:2]
+    pad = 2 * win + 2
+    refined = []
+
+    for (cx, cy) in corners:
+        x1 = int(max(cx - pad, 0))
+        y1 = int(max(cy - pad, 0))
+        x2 = int(min(cx + pad + 1, w))
+        y2 = int(min(cy + pad + 1, h))
+
+        # Too close to the border for a full window: keep the estimate
+        if x2 - x1 < 2 * win + 5 or y2 - y1 < 2 * win + 5:
+            refined.append((float(cx), float(cy)))
+            continue
+
+        patch = gray_patch(image, y1, y2, x1, x2)
+
+        pt = np.array([[[cx - x1, cy - y1]]], np.float32)
+        pt = cv2.cornerSubPix(patch, pt, (win, win), (-1, -1), criteria)
+        refined.append((float(pt[0, 0, 0] + x1), float(pt[0, 0, 1] + y1)))
+
+    return refined
+
+
+# ============================================================
+# 9. Coarse-to-fine pyramid detection
+# ============================================================
+def detect_4_corners_pyramid(img, level=2, refine="subpix"):
+    """
+    Finds the quad on a 1/level downscale, then refines each corner once,
+    in a small full-resolution window (CornerDetector's pyramid mode).
+
+    refine : "subpix" (cornerSubPix), "harris" (refine_corners_harris) or None
+    """
+    detector = CornerDetector(refine=refine, pyramid_min_width=0, pyramid_level=level)
+    return detector.detect(img).corners
+
+
+# ============================================================
+# 10. Configurable detector engine
+# ============================================================
+class CornerResult:
+    """
+    Output of CornerDetector.detect().
+
+    corners    : [TL, TR, BR, BL] or None
+    edges      : Canny image (a detector buffer, overwritten by the next
+                 frame; None for line backends that skip Canny)
+    lines      : (N,4) line segments from the line stage
+    horizontal : (Nh,4) merged horizontal segments
+    vertical   : (Nv,4) merged vertical segments
+    h_support  : (Nh,) support of each horizontal line (summed length)
+    v_support  : (Nv,) support of each vertical line
+    points     : (K,2) candidate intersections
+    support    : (4,) quad side support / side length, see quad_support
+    timings    : {stage: seconds} for this frame
+    scale      : full-resolution px per detection px (> 1 for pyramid runs)
+    """
+
+    def __init__(self):
+        empty = np.empty((0, 4), np.float64)
+        self.corners = None
+        self.edges = None
+        self.lines = empty
+        self.horizontal = empty
+        self.vertical = empty
+        self.h_support = np.empty(0, np.float64)
+        self.v_support = np.empty(0, np.float64)
+        self.points = np.empty((0, 2), np.float64)
+        self.support = None
+        self.timings = {}
+        self.scale = 1.0
+
+    @property
+    def found(self):
+        return self.corners is not None
+
+
+class CornerDetector:
+    """
+    Canny → lines → classify → merge → intersect → select → refine, with
+    every stage replaceable:
+
+        edges(img, params)              -> edge image
+        lines(edges, img_shape, params) -> (N,4) segments
+                                           (or a LINE_BACKENDS name)
+        classify(lines, img_shape)      -> (horizontal, vertical)
+        merge(segments, params)         -> segments or (segments, support)
+                                           (per class; False = off)
+        intersect(h, v, img_shape)      -> (K,2) points
+        select(points)                  -> corners or None
+        refine(img, corners, params)    -> corners    ("harris", "subpix" or None)
+
+    A quad whose weakest side is supported by less than `min_support` of
+    its length (quad_support) is rejected, so stray short lines cannot make
+    up a screen; None disables the check.
+
+    Gray / blur / edge / pyramid images live in buffers reused across
+    frames of the same size (for a FrameContext, in the buffers the caller
+    gave it; see model/frame.py). Frames at least `pyramid_min_width` wide are
+    detected on a 1/pyramid_level downscale; the refine stage then runs
+    once at full resolution, with its window widened to cover the coarse
+    estimate's error (refine=None returns the upscaled coarse corners,
+    good to about pyramid_level px).
+    """
+
+    STAGES = ("pyramid", "edges", "lines", "classify", "merge",
+              "intersect", "select", "refine")
+
+    def __init__(self, edges=None, lines=None, classify=None, merge=None,
+                 intersect=None, select=None, refine="harris",
+                 canny=(50, 150), min_support=None,
+                 pyramid_min_width=None, pyramid_level=2):
+        self.canny = canny
+        self.min_support = min_support
+        self.pyramid_min_width = pyramid_min_width
+        self.pyramid_level = pyramid_level
+
+        if isinstance(lines, str):
+            lines = LINE_BACKENDS[lines]
+
+        self.edges = edges or self._edges
+        self.lines = lines or lines_houghp
+        self.classify = classify or self._classify
+        self.merge = self._merge if merge is None else (merge or None)
+        self.intersect = intersect or (lambda h, v, shape: intersect_lines(h, v, shape))
+        self.select = select or extract_corners_from_points
+
+        if refine == "harris":
+            refine = lambda img, c, p: refine_corners_harris(img, c, search=p["search"])
+        elif refine == "subpix":
+            refine = lambda img, c, p: refine_corners_subpix(img, c, win=max(5, p["search"]))
+        self.refine = refine
+
+        self._buffers = {}
+        self.totals = dict.fromkeys(self.STAGES, 0.0)
+        self.frames = 0
+
+    # ---------------- default stages ----------------
+    def _buffer(self, name, shape, dtype=np.uint8):
+        buf = self._buffers.get(name)
+        if buf is None or buf.shape != shape or buf.dtype != dtype:
+            buf = np.empty(shape, dtype)
+            self._buffers[name] = buf
+        return buf
+
+    def _edges(self, img, params):
+        low, high = self.canny
+        if isinstance(img, FrameContext):
+            return img.edges(params["blur"], low, high)
+
+        gray = self._gray(img)
+
+        k = params["blur"]
+        if k > 0:
+            gray = cv2.GaussianBlur(gray, (k, k), 0,
+                                    dst=self._buffer("blur", gray.shape))
+
+        return cv2.Canny(gray, low, high, edges=self._buffer("edges", gray.shape))
+
+    def _gray(self, img):
+        if isinstance(img, FrameContext):
+            return img.gray
+        if img.ndim == 3:
+            return cv2.cvtColor(img, cv2.COLOR_BGR2GRAY,
+                                dst=self._buffer("gray", img.shape[:2]))
+        return img
+
+    def _classify(self, lines, img_shape):
+        horizontal, vertical, _, _ = classify_lines(lines, img_shape)
+        return horizontal, vertical
+
+    def _merge(self, segments, params):
+        return merge_lines(segments, offset_tol=params["merge_offset"])
+
+    def _merged(self, segments, params):
+        """(segments, support); unmerged segments support their own length."""
+        out = self.merge(segments, params) if self.merge is not None else segments
+        if isinstance(out, tuple):
+            return out
+        seg = np.asarray(out, np.float64).reshape(-1, 4)
+        return seg, np.hypot(seg[:, 2] - seg[:, 0], seg[:, 3] - seg[:, 1])
+
+    # ---------------- engine ----------------
+    def _run(self, img, result):
+        t = result.timings
+        shape = img.shape
+        params = scale_params(shape[1])
+
+        t0 = time.perf_counter()
+        if getattr(self.lines, "uses_edges", True):
+            result.edges = self.edges(img, params)
+            source = result.edges
+        else:
+            source = self._gray(img)
+        t1 = time.perf_counter()
+        t["edges"] = t1 - t0
+
+        result.lines = self.lines(source, shape, params)
+        t0 = time.perf_counter()
+        t["lines"] = t0 - t1
+        if len(result.lines) == 0:
+            return result
+
+        horizontal, vertical = self.classify(result.lines, shape)
+        t1 = time.perf_counter()
+        t["classify"] = t1 - t0
+
+        horizontal, result.h_support = self._merged(horizontal, params)
+        vertical, result.v_support = self._merged(vertical, params)
+        if self.merge is not None:
+            t0 = time.perf_counter()
+            t["merge"] = t0 - t1
+            t1 = t0
+        result.horizontal, result.vertical = horizontal, vertical
+        if len(horizontal) < 2 or len(vertical) < 2:
+            return result
+
+        result.points = self.intersect(horizontal, vertical, shape)
+        t0 = time.perf_counter()
+        t["intersect"] = t0 - t1
+        if len(result.points) < 4:
+            return result
+
+        corners = self.select(result.points)
+        if corners is not None:
+            result.support = quad_support(corners, horizontal, vertical,
+                                          result.h_support, result.v_support,
+                                          tol=params["search"])
+            if self.min_support is not None and result.support.min() < self.min_support:
+                corners = None
+        result.corners = corners
+        t["select"] = time.perf_counter() - t0
+        return result
+
+    def detect(self, img):
+        """img: BGR/gray image or FrameContext. Returns a CornerResult."""
+        result = CornerResult()
+        H, W = img.shape[:2]
+        level = self.pyramid_level
+
+        if self.pyramid_min_width is not None and W >= self.pyramid_min_width and level > 1:
+            t0 = time.perf_counter()
+            base = img.gray if isinstance(img, FrameContext) else img
+            size = (W // level, H // level)
+            small = cv2.resize(base, size, interpolation=cv2.INTER_AREA,
+                               dst=self._buffer("pyramid", (size[1], size[0]) + base.shape[2:]))
+            result.timings["pyramid"] = time.perf_counter() - t0
+
+            self._run(small, result)
+            result.scale = W / float(size[0])
+
+            if result.corners is not None:
+                # Pixel centres: x_full = (x_small + 0.5) * s - 0.5
+                s = result.scale
+                result.corners = [((x + 0.5) * s - 0.5, (y + 0.5) * s - 0.5)
+                                  for x, y in result.corners]
+        else:
+            self._run(img, result)
+
+        if result.corners is not None and self.refine is not None:
+            t0 = time.perf_counter()
+            params = scale_params(W)
+            if result.scale > 1:
+                # The coarse estimate is good to about one low-res pixel
+                params["search"] = max(params["search"], int(round(result.scale)) + 1)
+            result.corners = self.refine(img, result.corners, params)
+            result.timings["refine"] = time.perf_counter() - t0
+
+        self.frames += 1
+        for stage, dt in result.timings.items():
+            self.totals[stage] += dt
+        return result
+
+    def stage_report(self):
+        """Mean milliseconds per frame for each stage."""
+        n = max(self.frames, 1)
+        return {stage: 1000.0 * total / n for stage, total in self.totals.items()}
+
+
 def draw_corners(image, corners, color=(0, 0, 255), radius=8, thickness=-1):
-    img = image.copy()
+    """Returns a copy of the image with the corners drawn (the only copy made)."""
+    img = as_bgr(image).copy()
 
     for (x, y) in corners:
         cv2.circle(img, (int(x), int(y)), radius, color, thickness)
@@ -0,0 +1,98 @@
+"""
+frame.py
+
+Per-frame conversion cache shared by the corner, gesture and drawing code:
+    - FrameContext : wraps one BGR frame and computes gray / blurred /
+                     edges / RGB lazily, each at most once per frame,
+                     optionally into buffers reused from frame to frame
+    - gray_patch   : gray ROI from a context, BGR or gray image, converting
+                     only the patch when no full gray image exists yet
+"""
+
+import cv2
+import numpy as np
+
+
+class FrameContext:
+    """
+    buffers: optional dict kept across frames by the caller. The full-frame
+    images are then written into the same arrays every frame instead of
+    being allocated, so anything kept past its frame must be copied (as
+    FlowTracker does with its patches).
+    """
+
+    def __init__(self, bgr, buffers=None):
+        self.bgr = bgr
+        self._cache = {}
+        self._buffers = buffers
+
+    def _dst(self, key, shape):
+        """Reused output array for `key`, or None (let OpenCV allocate)."""
+        if self._buffers is None:
+            return None
+        buf = self._buffers.get(key)
+        if buf is None or buf.shape != shape:
+            buf = self._buffers[key] = np.empty(shape, np.uint8)
+        return buf
+
+    @property
+    def shape(self):
+        return self.bgr.shape
+
+    @property
+    def gray(self):
+        g = self._cache.get("gray")
+        if g is None:
+            g = cv2.cvtColor(self.bgr, cv2.COLOR_BGR2GRAY,
+                             dst=self._dst("gray", self.bgr.shape[:2]))
+            self._cache["gray"] = g
+        return g
+
+    @property
+    def rgb(self):
+        c = self._cache.get("rgb")
+        if c is None:
+            c = cv2.cvtColor(self.bgr, cv2.COLOR_BGR2RGB,
+                             dst=self._dst("rgb", self.bgr.shape))
+            self._cache["rgb"] = c
+        return c
+
+    def blurred(self, ksize=5):
+        if ksize <= 0:
+            return self.gray
+        key = ("blur", ksize)
+        b = self._cache.get(key)
+        if b is None:
+            b = cv2.GaussianBlur(self.gray, (ksize, ksize), 0,
+                                 dst=self._dst(key, self.bgr.shape[:2]))
+            self._cache[key] = b
+        return b
+
+    def edges(self, blur=5, low=50, high=150):
+        key = ("edges", blur, low, high)
+        e = self._cache.get(key)
+        if e is None:
+            e = cv2.Canny(self.blurred(blur), low, high,
+                          edges=self._dst(key, self.bgr.shape[:2]))
+            self._cache[key] = e
+        return e
+
+    def gray_roi(self, y1, y2, x1, x2):
+        """Gray patch: a view of the cached gray image, or a patch-only conversion."""
+        g = self._cache.get("gray")
+        if g is not None:
+            return g[y1:y2, x1:x2]
+        return cv2.cvtColor(self.bgr[y1:y2, x1:x2], cv2.COLOR_BGR2GRAY)
+
+
+def as_bgr(img):
+    return img.bgr if isinstance(img, FrameContext) else img
+
+
+def gray_patch(img, y1, y2, x1, x2):
+    if isinstance(img, FrameContext):
+        return img.gray_roi(y1, y2, x1, x2)
+    patch = img[y1:y2, x1:x2]
+    if patch.ndim == 3:
+        patch = cv2.cvtColor(patch, cv2.COLOR_BGR2GRAY)
+    return patch
@@ -0,0 +1,161 @@
+"""
+hand_backends.py
+
+Hand landmark sources for HandGestureController. Every backend has
+
+    landmarks(rgb) -> (K,2) array or None
+
+returning the LANDMARK_IDS points (wrist, thumb tip, index tip, middle
+MCP) in coordinates normalised to the input image, like MediaPipe.
+
+    - MediaPipeHands : MediaPipe Hands (imported on construction only)
+    - SkinHands      : skin segmentation + largest contour; fingertip only,
+                       for CPU-starved nodes (no thumb → no pinch)
+    - ScriptedHands  : replays a recorded / generated landmark track, for
+                       benchmarks and tests without any model
+    - make_hand_backend(name) : "mediapipe", "skin" or "fake"
+"""
+
+import cv2
+import numpy as np
+
+from model.trajectory import LANDMARK_IDS, WRIST, THUMB_TIP, INDEX_TIP, MIDDLE_MCP
+
+
+# ============================================================
+# 1. MediaPipe
+# ============================================================
+class MediaPipeHands:
+    name = "mediapipe"
+
+    def __init__(self, min_detection_confidence=0.6, min_tracking_confidence=0.6):
+        import mediapipe as mp
+
+        self.hands = mp.solutions.hands.Hands(
+            max_num_hands=1,
+            min_detection_confidence=min_detection_confidence,
+            min_tracking_confidence=min_tracking_confidence
+        )
+
+    def landmarks(self, rgb):
+        result = self.hands.process(rgb)
+        if not result.multi_hand_landmarks:
+            return None
+
+        lm = result.multi_hand_landmarks[0].landmark
+        return np.array([(lm[i].x, lm[i].y) for i in LANDMARK_IDS])
+
+
+# ============================================================
+# 2. Skin segmentation
+# ============================================================
+class SkinHands:
+    """
+    YCrCb skin mask → largest blob. The fingertip is the blob's topmost
+    point, the middle MCP its centroid, and the wrist is placed opposite
+    the fingertip, so hand size (wrist → MCP) scales with the blob.
+    """
+
+    name = "skin"
+
+    def __init__(self, cr=(133, 173), cb=(77, 127), min_area=0.01, wrist_ratio=0.6):
+        self.lower = np.array([0, cr[0], cb[0]], np.uint8)
+        self.upper = np.array([255, cr[1], cb[1]], np.uint8)
+        self.min_area = min_area
+        self.wrist_ratio = wrist_ratio
+        self.kernel = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (5, 5))
+
+    def landmarks(self, rgb):
+        h, w = rgb.shape[:2]
+
+        ycrcb = cv2.cvtColor(rgb, cv2.COLOR_RGB2YCrCb)
+        mask = cv2.inRange(ycrcb, self.lower, self.upper)
+        mask = cv2.morphologyEx(mask, cv2.MORPH_OPEN, self.kernel)
+
+        contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        if not contours:
+            return None
+
+        blob = max(contours, key=cv2.contourArea)
+        m = cv2.moments(blob)
+        if m["m00"] < self.min_area * w * h:
+            return None
+
+        centre = np.array([m["m10"] / m["m00"], m["m01"] / m["m00"]])
+        pts = blob.reshape(-1, 2)
+        tip = pts[np.argmin(pts[:, 1])].astype(float)
+
+        out = np.empty((len(LANDMARK_IDS), 2))
+        out[INDEX_TIP] = tip
+        out[MIDDLE_MCP] = centre
+        out[WRIST] = centre + self.wrist_ratio * (centre - tip)
+        out[THUMB_TIP] = np.nan
+        return out / (w, h)
+
+
+# ============================================================
+# 3. Scripted fake
+# ============================================================
+class ScriptedHands:
+    """
+    Returns the next entry of `track` on every call: a (K,2) array of
+    normalised landmarks, or None for "no hand". After the end it
+    returns None, or starts over with loop=True.
+    """
+
+    name = "fake"
+
+    def __init__(self, track=(), loop=False):
+        self.track = list(track)
+        self.loop = loop
+        self.pos = 0
+
+    def landmarks(self, rgb=None):
+        if self.pos >= len(self.track):
+            if not self.loop or not self.track:
+                return None
+            self.pos = 0
+        pts = self.track[self.pos]
+        self.pos += 1
+        return None if pts is None else np.asarray(pts, float)
+
+
+def hand_pose(x, y, size=0.15, pinch=1.0):
+    """Synthetic landmarks: index tip at (x, y), hand pointing up."""
+    out = np.empty((len(LANDMARK_IDS), 2))
+    out[INDEX_TIP] = (x, y)
+    out[MIDDLE_MCP] = (x, y + 0.8 * size)
+    out[WRIST] = (x, y + 1.8 * size)
+    out[THUMB_TIP] = (x - pinch * 0.6 * size, y + 0.3 * size)
+    return out
+
+
+def swipe_track(direction, still=10, moving=6, step=0.05, start=(0.5, 0.5), size=0.15):
+    """Hand at rest, one swipe of `moving` frames, rest again."""
+    d = {"left": (-1, 0), "right": (1, 0), "up": (0, -1), "down": (0, 1)}[direction]
+    x, y = start
+    track = [hand_pose(x, y, size) for _ in range(still)]
+    for _ in range(moving):
+        x, y = x + d[0] * step, y + d[1] * step
+        track.append(hand_pose(x, y, size))
+    track += [hand_pose(x, y, size) for _ in range(still)]
+    return track
+
+
+def pinch_track(hold=8, still=6, start=(0.5, 0.5), size=0.15):
+    """Open hand, pinch held for `hold` frames, open again."""
+    x, y = start
+    return ([hand_pose(x, y, size) for _ in range(still)]
+            + [hand_pose(x, y, size, pinch=0.1) for _ in range(hold)]
+            + [hand_pose(x, y, size) for _ in range(still)])
+
+
+HAND_BACKENDS = {
+    "mediapipe": MediaPipeHands,
+    "skin": SkinHands,
+    "fake": ScriptedHands,
+}
+
+
+def make_hand_backend(name="mediapipe", **kwargs):
+    return HAND_BACKENDS[name](**kwargs)
@@ -1,41 +1,200 @@
+import collections
+import threading
+import time
+
 import cv2
-import mediapipe as mp
 import numpy as np
-import time
+
+from model.frame import FrameContext
+from model.hand_backends import make_hand_backend
+from model.trajectory import GestureClassifier, INDEX_TIP
+
+
+class MotionGate:
+    """
+    Cheap frame-differencing gate in front of the hand backend.
+
+    Each frame's crop is shrunk to size x size gray and compared with the
+    previous one; when more than min_fraction of the pixels changed by
+    more than `threshold` grey levels, the gate opens for `hold` seconds
+    (re-armed by further motion or by the backend still seeing a hand).
+    While closed, only every idle_every-th frame passes, so a hand that
+    entered without visible motion is still found.
+    """
+
+    def __init__(self, size=48, threshold=15, min_fraction=0.01,
+                 hold=1.0, idle_every=10):
+        self.size = size
+        self.threshold = threshold
+        self.min_fraction = min_fraction
+        self.hold = hold
+        self.idle_every = idle_every
+
+        self._prev = None
+        self._open_until = 0.0
+        self._idle_count = 0
+
+        self.frames = 0
+        self.passed = 0
+        self.triggers = 0
+
+    def update(self, crop, now=None):
+        """crop: BGR region the backend would see. True if it should run."""
+        now = time.time() if now is None else now
+        self.frames += 1
+
+        small = cv2.resize(crop, (self.size, self.size), interpolation=cv2.INTER_AREA)
+        small = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+
+        moved = False
+        if self._prev is not None:
+            diff = cv2.absdiff(small, self._prev)
+            changed = np.count_nonzero(diff > self.threshold)
+            moved = changed > self.min_fraction * diff.size
+        self._prev = small
+
+        if moved:
+            if now >= self._open_until:
+                self.triggers += 1
+            self._open_until = now + self.hold
+
+        if now < self._open_until:
+            run = True
+        else:
+            self._idle_count += 1
+            run = self._idle_count >= self.idle_every
+            if run:
+                self._idle_count = 0
+
+        self.passed += run
+        return run
+
+    def hand_seen(self, now=None):
+        """Keep the gate open while the backend still finds a hand."""
+        now = time.time() if now is None else now
+        self._open_until = max(self._open_until, now + self.hold)
+
+    def stats(self):
+        return {
+            "gate_frames": self.frames,
+            "gate_passed": self.passed,
+            "duty_cycle": self.passed / max(self.frames, 1),
+            "motion_triggers": self.triggers,
+        }
+
 
 class HandGestureController:
-    def __init__(self, smoothing=0.3, min_swipe=35, cooldown=0.4):
-        self.mp_hands = mp.solutions.hands
-        self.hands = self.mp_hands.Hands(
-            max_num_hands=1,
-            min_detection_confidence=0.6,
-            min_tracking_confidence=0.6
-        )
-
-        self.last_pos = None
-        self.smoothing = smoothing
-        self.min_swipe = min_swipe
-        self.last_trigger = 0
-        self.cooldown = cooldown
-
-    def detect_gesture(self, frame, box=None):
-        h, w = frame.shape[:2]
-        rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        result = self.hands.process(rgb)
-
-        if not result.multi_hand_landmarks:
-            self.last_pos = None
-            return None
-
-        lm = result.multi_hand_landmarks[0]
-
-        # --- index fingertip ---
-        ix = int(lm.landmark[8].x * w)
-        iy = int(lm.landmark[8].y * h)
-        current = np.array([ix, iy], dtype=float)
-
-        # draw fingertip
-        cv2.circle(frame, (ix, iy), 10, (0, 255, 0), -1)
+    """
+    Swipe / pinch detector over a pluggable hand backend
+    (model/hand_backends.py: "mediapipe", "skin", "fake" or an instance),
+    constructed on first use so importing this module loads no model.
+
+    The backend never sees the full frame: the screen box (plus crop_margin
+    of its size on each side), or the whole frame when no box is known, is
+    resized into a fixed input_size x input_size canvas, and landmarks are
+    mapped back to full-frame pixels.
+
+    With a MotionGate (gate=True for the defaults), the backend only runs
+    while that crop shows motion or a hand, plus a low idle duty cycle.
+
+    Landmarks go into a GestureClassifier (model/trajectory.py), which
+    returns swipes ("left"/"right"/"up"/"down") and "pinch"/"release".
+    """
+
+    def __init__(self, cooldown=0.4, input_size=256, crop_margin=0.15,
+                 gate=None, classifier=None, backend="mediapipe"):
+        self._backend = backend
+
+        self.classifier = classifier or GestureClassifier(cooldown=cooldown)
+
+        self.input_size = input_size
+        self.crop_margin = crop_margin
+        self._canvas = np.zeros((input_size, input_size, 3), np.uint8)
+
+        self.gate = MotionGate() if gate is True else gate
+
+    @property
+    def backend(self):
+        if isinstance(self._backend, str):
+            self._backend = make_hand_backend(self._backend)
+        return self._backend
+
+    def _crop_rect(self, frame, box):
+        """(x0, y0, x1, y1): box bounding rect + margin, or the whole frame."""
+        H, W = frame.shape[:2]
+        x0, y0, x1, y1 = 0, 0, W, H
+
+        if box is not None:
+            pts = np.asarray(box, float).reshape(-1, 2)
+            (bx0, by0), (bx1, by1) = pts.min(axis=0), pts.max(axis=0)
+            mx = self.crop_margin * (bx1 - bx0)
+            my = self.crop_margin * (by1 - by0)
+
+            cx0, cy0 = int(max(bx0 - mx, 0)), int(max(by0 - my, 0))
+            cx1, cy1 = int(min(bx1 + mx, W)), int(min(by1 + my, H))
+            if cx1 - cx0 >= 16 and cy1 - cy0 >= 16:
+                x0, y0, x1, y1 = cx0, cy0, cx1, cy1
+
+        return x0, y0, x1, y1
+
+    def _inference_input(self, frame, rect):
+        """
+        Crop letterboxed into the fixed RGB canvas. Returns (canvas, s):
+        a canvas pixel (u, v) is full-frame pixel (x0 + u / s, y0 + v / s).
+        """
+        x0, y0, x1, y1 = rect
+        n = self.input_size
+        s = n / float(max(x1 - x0, y1 - y0))
+        w = min(n, max(1, int(round((x1 - x0) * s))))
+        h = min(n, max(1, int(round((y1 - y0) * s))))
+
+        # Only the crop is resized and converted to RGB, never the frame
+        small = cv2.resize(frame[y0:y1, x0:x1], (w, h),
+                           interpolation=cv2.INTER_AREA if s < 1 else cv2.INTER_LINEAR)
+        canvas = self._canvas
+        canvas[h:, :] = 0
+        canvas[:h, w:] = 0
+        cv2.cvtColor(small, cv2.COLOR_BGR2RGB, dst=canvas[:h, :w])
+        return canvas, s
+
+    def detect_gesture(self, frame, box=None, timestamp=None, origin=(0, 0)):
+        """
+        One frame → (gesture event or None, index fingertip (x, y) in
+        full-frame pixels or None). `timestamp` is the frame's capture time
+        (defaults to now); swipe speeds are measured with it. The frame is
+        only read, never drawn into.
+
+        `frame` may be a crop whose top-left pixel sits at `origin` in the
+        full frame (see GestureWorker.submit); `box` is in full-frame pixels.
+        """
+        if isinstance(frame, FrameContext):
+            frame = frame.bgr
+        if timestamp is None:
+            timestamp = time.time()
+
+        ox, oy = origin
+        local = None if box is None else np.asarray(box, float).reshape(-1, 2) - (ox, oy)
+        rect = self._crop_rect(frame, local)
+        x0, y0, x1, y1 = rect
+
+        # Idle: no motion and no hand recently → skip the backend
+        if self.gate is not None and not self.gate.update(frame[y0:y1, x0:x1]):
+            return self.classifier.reset(), None
+
+        rgb, s = self._inference_input(frame, rect)
+        n = self.input_size
+        pts = self.backend.landmarks(rgb)
+
+        if pts is None:
+            return self.classifier.reset(), None
+
+        if self.gate is not None:
+            self.gate.hand_seen()
+
+        # --- tracked landmarks (canvas → full-frame pixels) ---
+        pts = pts * (n / s) + (x0 + ox, y0 + oy)
+        ix, iy = pts[INDEX_TIP].astype(int)
+        fingertip = (int(ix), int(iy))
 
         # BOX CONSTRAINT
         if box is not None:
@@ -48,33 +207,141 @@ class HandGestureController:
 
             if not (x_min < ix < x_max and y_min < iy < y_max):
                 # Finger is outside the box → ignore
-                self.last_pos = None
-                return None
+                return self.classifier.reset(), fingertip
 
-        # initialize tracking
-        if self.last_pos is None:
-            self.last_pos = current
-            return None
+        return self.classifier.update(timestamp, pts), fingertip
 
-        # --- smoothing ---
-        smoothed = (1 - self.smoothing) * self.last_pos + self.smoothing * current
 
-        dx = smoothed[0] - self.last_pos[0]
-        dy = smoothed[1] - self.last_pos[1]
-        self.last_pos = smoothed
+class GestureWorker:
+    """
+    Runs a HandGestureController on its own thread so gesture inference
+    never holds up the corner loop.
 
-        dist = np.hypot(dx, dy)
-        now = time.time()
+    submit() hands over a private copy of the newest frame's hand crop (an
+    unprocessed older one is dropped), so the caller's frame and its
+    FrameContext are never touched from this thread. Detected gestures
+    are queued with the capture timestamp of the frame they came from and
+    collected with poll(); `fingertip` is the index fingertip of the
+    newest processed frame, for the caller to draw.
+    """
 
-        if dist < self.min_swipe:
-            return None
+    def __init__(self, controller=None, max_events=32):
+        self.controller = controller or HandGestureController()
 
-        if now - self.last_trigger < self.cooldown:
-            return None
+        self._cond = threading.Condition()
+        self._pending = None            # (crop, origin, timestamp, box)
+        self._events = collections.deque(maxlen=max_events)
 
-        self.last_trigger = now
+        # Timestamp and fingertip (full-frame px or None) of the newest
+        # frame inference finished on
+        self.timestamp = 0.0
+        self.fingertip = None
 
-        if abs(dx) > abs(dy):
-            return "right" if dx > 0 else "left"
-        else:
-            return "down" if dy > 0 else "up"
+        self.submitted = 0
+        self.processed = 0
+        self.dropped = 0
+        self.failed = 0
+        self.busy_time = 0.0
+        self.latency = 0.0              # EMA: frame capture → result, s
+
+        self._running = False
+        self._thread = None
+        self._t_start = None
+
+    def start(self):
+        if self._running:
+            return self
+        self._running = True
+        self._t_start = time.time()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def submit(self, frame, timestamp, box=None):
+        """
+        Non-blocking; replaces any frame the worker has not picked up yet.
+        Only the crop the controller would look at is copied.
+        """
+        if isinstance(frame, FrameContext):
+            frame = frame.bgr
+        x0, y0, x1, y1 = self.controller._crop_rect(frame, box)
+        crop = frame[y0:y1, x0:x1].copy()
+
+        with self._cond:
+            if self._pending is not None:
+                self.dropped += 1
+            self._pending = (crop, (x0, y0), timestamp, box)
+            self.submitted += 1
+            self._cond.notify()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while self._running and self._pending is None:
+                    self._cond.wait()
+                if not self._running:
+                    return
+                crop, origin, timestamp, box = self._pending
+                self._pending = None
+
+            # A backend error (e.g. a missing model) must not end the
+            # thread, or gestures would silently stop while frames pile up
+            t0 = time.time()
+            try:
+                direction, fingertip = self.controller.detect_gesture(
+                    crop, box=box, timestamp=timestamp, origin=origin)
+            except Exception as e:
+                with self._cond:
+                    self.failed += 1
+                    failed = self.failed
+                # The first failure, then every 100th (errors tend to repeat per frame)
+                if failed == 1 or failed % 100 == 0:
+                    print(f"✖ Gesture inference failed ({failed}x): {e!r}")
+                continue
+            t1 = time.time()
+
+            with self._cond:
+                self.processed += 1
+                self.busy_time += t1 - t0
+                self.timestamp = timestamp
+                self.fingertip = fingertip
+                self.latency = t1 - timestamp if self.processed == 1 \
+                    else 0.9 * self.latency + 0.1 * (t1 - timestamp)
+                if direction is not None:
+                    self._events.append((direction, timestamp))
+
+    def poll(self):
+        """Gestures detected since the last call, as (direction, frame timestamp)."""
+        with self._cond:
+            events = list(self._events)
+            self._events.clear()
+        return events
+
+    def stats(self):
+        elapsed = max(time.time() - self._t_start, 1e-6) if self._t_start else 1e-6
+        stats = {
+            "fps": self.processed / elapsed,
+            "processed": self.processed,
+            "dropped": self.dropped,
+            "failed": self.failed,
+            "mean_ms": 1000.0 * self.busy_time / max(self.processed, 1),
+            "latency_ms": 1000.0 * self.latency,
+        }
+        gate = getattr(self.controller, "gate", None)
+        if gate is not None:
+            stats.update(gate.stats())
+        return stats
+
+    def stop(self):
+        with self._cond:
+            self._running = False
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join(timeout=2.0)
+            self._thread = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
@@ -0,0 +1,431 @@
+"""
+tracking.py
+
+Frame-to-frame tracking of the 4-corner screen quad:
+    - ROITracker : after a lock, runs Canny + Hough only in thin bands
+                   around the four edges of the previous quad, falling back
+                   to full-frame detection when support drops
+    - QuadKalman : constant-velocity Kalman filter over the 8 corner coords
+    - DetectionScheduler : full detection every N frames or on large
+                   innovation, Kalman prediction in between
+    - FlowTracker : carries refined corners forward with pyramidal
+                   Lucas-Kanade on small patches, forward-backward checked
+"""
+
+import cv2
+import numpy as np
+
+from model.frame import gray_patch
+from model.corners import (
+    scale_params,
+    detect_edges,
+    hough_segments,
+    classify_lines,
+    merge_lines,
+    segments_to_homogeneous,
+    CornerDetector,
+)
+
+
+# Quad edges as (start, end) corner indices into [TL, TR, BR, BL],
+# with the orientation class of the line expected along each edge
+QUAD_EDGES = [
+    ("top",    0, 1, "h"),
+    ("right",  1, 2, "v"),
+    ("bottom", 3, 2, "h"),
+    ("left",   0, 3, "v"),
+]
+
+
+def quad_intersections(top, right, bottom, left):
+    """Corners [TL, TR, BR, BL] from four edge segments, or None if parallel."""
+    L = segments_to_homogeneous(np.array([top, right, bottom, left]))
+    pairs = [(0, 3), (0, 1), (2, 1), (2, 3)]
+
+    corners = []
+    for a, b in pairs:
+        p = np.cross(L[a], L[b])
+        if abs(p[2]) < 1e-6:
+            return None
+        corners.append((p[0] / p[2], p[1] / p[2]))
+    return corners
+
+
+# ============================================================
+# ROI-band tracker
+# ============================================================
+class ROITracker:
+    """
+    Searches only bands of +/- `band` px (at the reference resolution)
+    around the previous quad's edges. Each edge must be supported by
+    merged Hough lines covering at least `min_support` of its length,
+    otherwise that frame falls back to full-frame detection. After
+    `max_misses` consecutive failures the lock is lost.
+
+    on_lock(corners) / on_loss() are called on lock state changes.
+    """
+
+    def __init__(self, band=16, min_support=0.4, max_misses=3,
+                 full_detect=None, on_lock=None, on_loss=None):
+        self.band = band
+        self.min_support = min_support
+        self.max_misses = max_misses
+        if full_detect is None:
+            detector = CornerDetector(refine=None)
+            full_detect = lambda img: detector.detect(img).corners
+        self.full_detect = full_detect
+        self.on_lock = on_lock
+        self.on_loss = on_loss
+
+        self.locked = False
+        self.misses = 0
+
+        self.roi_frames = 0
+        self.full_frames = 0
+        self.locks = 0
+        self.losses = 0
+        self.area_fraction = 1.0   # processed area / frame area, last frame
+
+    def _band_lines(self, img, p, q, cls, params, band):
+        H, W = img.shape[:2]
+
+        x0 = int(max(min(p[0], q[0]) - band, 0))
+        y0 = int(max(min(p[1], q[1]) - band, 0))
+        x1 = int(min(max(p[0], q[0]) + band, W))
+        y1 = int(min(max(p[1], q[1]) + band, H))
+        if x1 - x0 < 4 or y1 - y0 < 4:
+            return None, 0, 0
+
+        # Gray band only (a view when the frame's gray image is cached)
+        crop = gray_patch(img, y0, y1, x0, x1)
+        edges = detect_edges(crop, blur=params["blur"])
+
+        edge_len = float(np.hypot(q[0] - p[0], q[1] - p[1]))
+        lines = hough_segments(edges, crop.shape,
+                               threshold=max(10, params["threshold"] // 2),
+                               max_gap=params["max_gap"],
+                               min_len=0.2 * edge_len)
+        area = (x1 - x0) * (y1 - y0)
+        if lines is None:
+            return None, 0, area
+
+        lines = lines.reshape(-1, 4).astype(np.float64)
+        lines[:, [0, 2]] += x0
+        lines[:, [1, 3]] += y0
+
+        horizontal, vertical, _, _ = classify_lines(lines, img.shape)
+        segs = horizontal if cls == "h" else vertical
+        merged, support = merge_lines(segs, offset_tol=params["merge_offset"])
+        if len(merged) == 0:
+            return None, 0, area
+
+        best = int(np.argmax(support))
+        return merged[best], support[best] / max(edge_len, 1.0), area
+
+    def track(self, img, quad):
+        """Band-only detection around `quad`. Returns corners or None."""
+        quad = np.asarray(quad, float).reshape(4, 2)
+        params = scale_params(img.shape[1])
+        band = max(4, int(round(self.band * img.shape[1] / 800.0)))
+
+        lines = {}
+        area = 0
+        for name, i, j, cls in QUAD_EDGES:
+            line, support, a = self._band_lines(img, quad[i], quad[j], cls, params, band)
+            area += a
+            if line is None or support < self.min_support:
+                self.area_fraction = area / float(img.shape[0] * img.shape[1])
+                return None
+            lines[name] = line
+
+        self.area_fraction = area / float(img.shape[0] * img.shape[1])
+        return quad_intersections(lines["top"], lines["right"],
+                                  lines["bottom"], lines["left"])
+
+    def update(self, img, quad=None):
+        """
+        One frame: ROI tracking while locked (given the last quad),
+        full-frame detection otherwise or when ROI tracking fails.
+        """
+        corners = None
+        if self.locked and quad is not None:
+            corners = self.track(img, quad)
+            if corners is not None:
+                self.roi_frames += 1
+                self.misses = 0
+                return corners
+
+        corners = self.full_detect(img)
+        self.full_frames += 1
+        self.area_fraction = 1.0
+
+        if corners is not None:
+            self.misses = 0
+            if not self.locked:
+                self.locked = True
+                self.locks += 1
+                if self.on_lock is not None:
+                    self.on_lock(corners)
+            return corners
+
+        if self.locked:
+            self.misses += 1
+            if self.misses >= self.max_misses:
+                self.unlock()
+        return None
+
+    def unlock(self):
+        self.locked = False
+        self.misses = 0
+        self.losses += 1
+        if self.on_loss is not None:
+            self.on_loss()
+
+    def stats(self):
+        total = max(self.roi_frames + self.full_frames, 1)
+        return {
+            "roi_frames": self.roi_frames,
+            "full_frames": self.full_frames,
+            "roi_fraction": self.roi_frames / total,
+            "locks": self.locks,
+            "losses": self.losses,
+        }
+
+
+# ============================================================
+# Constant-velocity Kalman filter for the quad
+# ============================================================
+class QuadKalman:
+    """
+    Eight independent (position, velocity) filters, one per corner
+    coordinate, sharing the same model, so predict/update are batched.
+
+    accel_std : white-noise acceleration, px/s^2
+    meas_std  : detection noise, px
+    """
+
+    def __init__(self, accel_std=400.0, meas_std=1.5, init_vel_std=200.0):
+        self.q = accel_std ** 2
+        self.r = meas_std ** 2
+        self.init_vel_var = init_vel_std ** 2
+        self.reset()
+
+    def reset(self):
+        self.x = None               # (8, 2): position, velocity
+        self.P = None               # (8, 2, 2)
+        self.t = None
+
+    @property
+    def initialized(self):
+        return self.x is not None
+
+    @property
+    def corners(self):
+        if self.x is None:
+            return None
+        return self.x[:, 0].reshape(4, 2).copy()
+
+    def predict(self, t):
+        """Advance the state to time t (seconds). Returns predicted corners."""
+        if self.x is None:
+            return None
+
+        dt = max(t - self.t, 0.0)
+        self.t = t
+        if dt == 0.0:
+            return self.corners
+
+        F = np.array([[1.0, dt], [0.0, 1.0]])
+        Q = self.q * np.array([[dt ** 3 / 3, dt ** 2 / 2],
+                               [dt ** 2 / 2, dt]])
+
+        self.x = self.x @ F.T
+        self.P = F @ self.P @ F.T + Q
+        return self.corners
+
+    def innovation(self, corners):
+        """Largest pixel residual between a detection and the prediction."""
+        if self.x is None:
+            return np.inf
+        z = np.asarray(corners, float).reshape(8)
+        return float(np.abs(z - self.x[:, 0]).max())
+
+    def update(self, corners, t):
+        z = np.asarray(corners, float).reshape(8)
+
+        if self.x is None:
+            self.x = np.stack([z, np.zeros(8)], axis=1)
+            self.P = np.tile(np.diag([self.r, self.init_vel_var]), (8, 1, 1))
+            self.t = t
+            return self.corners
+
+        # Measurement is the position only: H = [1, 0]
+        S = self.P[:, 0, 0] + self.r                  # (8,)
+        K = self.P[:, :, 0] / S[:, None]              # (8, 2)
+        y = z - self.x[:, 0]
+
+        self.x = self.x + K * y[:, None]
+        self.P = self.P - K[:, :, None] * self.P[:, None, 0, :]
+        return self.corners
+
+
+# ============================================================
+# Detect-every-N scheduling
+# ============================================================
+class DetectionScheduler:
+    """
+    Decides per frame whether to run the full detector. Detections run
+    every `every` frames; a detection whose innovation exceeds
+    `max_innovation` px (the quad moved more than predicted) keeps
+    detection on for the following frames until it settles. Frames
+    measured between detections (e.g. by LK flow) report their innovation
+    too, and a jump there brings the next detection forward.
+    """
+
+    def __init__(self, every=4, max_innovation=12.0):
+        self.every = every
+        self.max_innovation = max_innovation
+
+        self._since = every
+        self._force = True
+
+        self.detect_frames = 0
+        self.predict_frames = 0
+
+    def should_detect(self):
+        return self._force or self._since >= self.every
+
+    def detected(self, innovation=None):
+        """Record a detection; innovation is None when it failed."""
+        self.detect_frames += 1
+        self._since = 1
+        self._force = innovation is None or innovation > self.max_innovation
+
+    def predicted(self, innovation=None):
+        """
+        Record a frame without detection; innovation is that of its
+        measurement, or None when the prediction alone stood in.
+        """
+        self.predict_frames += 1
+        self._since += 1
+        if innovation is not None and innovation > self.max_innovation:
+            self._force = True
+
+    def reset(self):
+        self._force = True
+
+    def stats(self):
+        total = max(self.detect_frames + self.predict_frames, 1)
+        return {
+            "detect_frames": self.detect_frames,
+            "predict_frames": self.predict_frames,
+            "detect_fraction": self.detect_frames / total,
+        }
+
+
+# ============================================================
+# Lucas-Kanade corner propagation
+# ============================================================
+class FlowTracker:
+    """
+    Propagates the four refined corners with pyramidal LK flow computed
+    on a (2*patch)^2 gray patch around each corner (patch in px at the
+    reference resolution), so no full-frame gray image or pyramid is built.
+
+    A corner is rejected when LK loses it, when flowing it back lands more
+    than `max_fb_error` px from where it started, or when it leaves its
+    patch; any rejection (or a non-convex quad) ends tracking and asks for
+    a full detection.
+    """
+
+    def __init__(self, patch=40, win=15, levels=2, max_fb_error=1.0):
+        self.patch = patch
+        self.lk_params = dict(
+            winSize=(win, win),
+            maxLevel=levels,
+            criteria=(cv2.TERM_CRITERIA_EPS | cv2.TERM_CRITERIA_COUNT, 20, 0.03),
+        )
+        self.max_fb_error = max_fb_error
+
+        self.pts = None
+        self._patches = None
+
+        self.flow_frames = 0
+        self.detections = 0
+        self.failures = 0
+
+    @property
+    def active(self):
+        return self.pts is not None
+
+    def _extract(self, img, pts):
+        H, W = img.shape[:2]
+        half = max(16, int(round(self.patch * W / 800.0)))
+
+        patches = []
+        for x, y in pts:
+            x0 = int(min(max(x - half, 0), W - 1))
+            y0 = int(min(max(y - half, 0), H - 1))
+            x1 = int(min(max(x + half, x0 + 1), W))
+            y1 = int(min(max(y + half, y0 + 1), H))
+            # Copy: the next frame must not keep this frame's gray alive
+            patches.append((x0, y0, x1, y1, gray_patch(img, y0, y1, x0, x1).copy()))
+        return patches
+
+    def seed(self, img, corners):
+        """Start from a full detection's refined corners."""
+        self.pts = np.asarray(corners, np.float32).reshape(4, 2)
+        self._patches = self._extract(img, self.pts)
+        self.detections += 1
+
+    def clear(self):
+        self.pts = None
+        self._patches = None
+
+    def track(self, img):
+        """Corners in `img`, or None when tracking quality is too low."""
+        if self.pts is None:
+            return None
+
+        new_pts = np.empty_like(self.pts)
+        for i, (x0, y0, x1, y1, prev) in enumerate(self._patches):
+            cur = gray_patch(img, y0, y1, x0, x1)
+            if cur.shape != prev.shape:
+                return self._fail()
+
+            p0 = (self.pts[i] - np.float32((x0, y0))).reshape(1, 1, 2)
+            p1, st, _ = cv2.calcOpticalFlowPyrLK(prev, cur, p0, None, **self.lk_params)
+            if not st[0, 0]:
+                return self._fail()
+
+            # Forward-backward consistency
+            p0r, st_back, _ = cv2.calcOpticalFlowPyrLK(cur, prev, p1, None, **self.lk_params)
+            if not st_back[0, 0] or np.linalg.norm(p0r - p0) > self.max_fb_error:
+                return self._fail()
+
+            x, y = p1[0, 0]
+            if not (0 <= x < x1 - x0 and 0 <= y < y1 - y0):
+                return self._fail()
+            new_pts[i] = (x + x0, y + y0)
+
+        if not cv2.isContourConvex(new_pts.reshape(-1, 1, 2)):
+            return self._fail()
+
+        self.pts = new_pts
+        self._patches = self._extract(img, new_pts)
+        self.flow_frames += 1
+        return new_pts.astype(np.float64)
+
+    def _fail(self):
+        self.failures += 1
+        self.clear()
+        return None
+
+    def stats(self):
+        total = max(self.flow_frames + self.detections, 1)
+        return {
+            "flow_frames": self.flow_frames,
+            "detections": self.detections,
+            "flow_fraction": self.flow_frames / total,
+            "failures": self.failures,
+        }
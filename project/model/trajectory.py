@@ -0,0 +1,160 @@
+"""
+trajectory.py
+
+Hand trajectory buffer and gesture classification for hand_gesture.py:
+    - LandmarkRing      : preallocated ring of timestamped landmark sets
+                          (wrist, thumb tip, index tip, middle MCP); every
+                          time window is a contiguous view, nothing is
+                          allocated per frame
+    - GestureClassifier : swipes from index-tip displacement / velocity over
+                          a sliding time window, pinch / release from the
+                          thumb-index distance in units of hand size
+
+Distances are in hand sizes (wrist → middle-finger MCP), so thresholds
+hold at any distance from the camera and any stream resolution.
+"""
+
+import numpy as np
+
+
+# MediaPipe hand landmark ids kept in the ring, and their slots
+LANDMARK_IDS = (0, 4, 8, 9)
+WRIST, THUMB_TIP, INDEX_TIP, MIDDLE_MCP = range(len(LANDMARK_IDS))
+
+
+class LandmarkRing:
+    """
+    Fixed-capacity history of (timestamp, landmarks (K,2)).
+
+    Samples are written twice, at i and i + capacity, so the newest n
+    samples are always the contiguous slice [i + capacity - n + 1, i + capacity]
+    and windows are returned as views.
+    """
+
+    def __init__(self, capacity=64, n_landmarks=len(LANDMARK_IDS)):
+        self.capacity = capacity
+        self._t = np.zeros(2 * capacity, np.float64)
+        self._p = np.zeros((2 * capacity, n_landmarks, 2), np.float64)
+        self._i = -1
+        self.n = 0
+
+    def __len__(self):
+        return self.n
+
+    def push(self, t, landmarks):
+        i = (self._i + 1) % self.capacity
+        self._t[i] = self._t[i + self.capacity] = t
+        self._p[i] = self._p[i + self.capacity] = landmarks
+        self._i = i
+        self.n = min(self.n + 1, self.capacity)
+
+    def clear(self):
+        self.n = 0
+
+    def last(self, n=None):
+        """Views (t (n,), landmarks (n,K,2)) of the newest n samples, oldest first."""
+        n = self.n if n is None else min(n, self.n)
+        end = self._i + self.capacity + 1
+        return self._t[end - n:end], self._p[end - n:end]
+
+    def since(self, t_from):
+        """Views of every sample with timestamp >= t_from."""
+        t, p = self.last()
+        k = np.searchsorted(t, t_from, side="left")
+        return t[k:], p[k:]
+
+
+class GestureClassifier:
+    """
+    update(t, landmarks) → "left" / "right" / "up" / "down" / "pinch" /
+    "release" or None.
+
+    Swipe: over the last `window` seconds the index tip moved at least
+    `swipe_dist` hand sizes, with a fitted speed of at least `min_speed`
+    hand sizes/s along a mostly straight path (`min_straightness`).
+    Pinch: thumb-index distance below `pinch_on` hand sizes (median of the
+    last 3 samples); release once it rises above `pinch_off`.
+    """
+
+    def __init__(self, window=0.25, swipe_dist=0.8, min_speed=3.0,
+                 min_straightness=0.7, min_samples=3, cooldown=0.4,
+                 pinch_on=0.35, pinch_off=0.55, capacity=64):
+        self.window = window
+        self.swipe_dist = swipe_dist
+        self.min_speed = min_speed
+        self.min_straightness = min_straightness
+        self.min_samples = min_samples
+        self.cooldown = cooldown
+        self.pinch_on = pinch_on
+        self.pinch_off = pinch_off
+
+        self.ring = LandmarkRing(capacity)
+        self.pinched = False
+        self.last_trigger = -np.inf
+
+    def reset(self):
+        """Hand lost. Returns "release" if a pinch was held."""
+        self.ring.clear()
+        if self.pinched:
+            self.pinched = False
+            return "release"
+        return None
+
+    def _hand_size(self, p):
+        size = np.median(np.linalg.norm(p[:, WRIST] - p[:, MIDDLE_MCP], axis=1))
+        return max(size, 1e-6)
+
+    def _pinch(self):
+        _, p = self.ring.last(3)
+        d = np.linalg.norm(p[:, THUMB_TIP] - p[:, INDEX_TIP], axis=1)
+        ratio = np.median(d) / self._hand_size(p)
+
+        if not self.pinched and ratio < self.pinch_on:
+            self.pinched = True
+            return "pinch"
+        if self.pinched and ratio > self.pinch_off:
+            self.pinched = False
+            return "release"
+        return None
+
+    def _swipe(self, now):
+        t, p = self.ring.since(now - self.window)
+        if len(t) < self.min_samples or now - self.last_trigger < self.cooldown:
+            return None
+
+        tip = p[:, INDEX_TIP]                        # (m, 2)
+        scale = self._hand_size(p)
+
+        disp = (tip[-1] - tip[0]) / scale
+        dist = np.hypot(*disp)
+        if dist < self.swipe_dist:
+            return None
+
+        path = np.linalg.norm(np.diff(tip, axis=0), axis=1).sum() / scale
+        if dist < self.min_straightness * path:
+            return None
+
+        # Least-squares velocity over the window (both axes at once)
+        tc = t - t.mean()
+        v = (tc @ (tip - tip.mean(axis=0))) / max(tc @ tc, 1e-12) / scale
+        if np.hypot(*v) < self.min_speed:
+            return None
+
+        self.last_trigger = now
+        self.ring.clear()   # the same stroke must not fire twice
+
+        if abs(disp[0]) > abs(disp[1]):
+            return "right" if disp[0] > 0 else "left"
+        return "down" if disp[1] > 0 else "up"
+
+    def update(self, t, landmarks):
+        self.ring.push(t, landmarks)
+
+        event = self._pinch()
+        if event is not None:
+            return event
+
+        # No swipes while pinching (pinch-drag)
+        if self.pinched:
+            return None
+        return self._swipe(t)
@@ -0,0 +1,116 @@
+"""
+undistort.py
+
+Lens correction for the tracker, applied to points rather than pixels:
+    - Undistorter.undistort_points : cv2.undistortPoints on detected points
+      (intersections, refined corners), back into pixel coordinates
+    - Undistorter.rectify : full-frame remap for visualisation, using
+      initUndistortRectifyMap maps computed once per resolution and cached
+      next to the calibration file
+
+The calibration was done on the SVGA stream (800x600); intrinsics are
+rescaled for the other stream resolutions.
+"""
+
+import hashlib
+import os
+
+import cv2
+import numpy as np
+
+from model.calibration_data import load_calibration
+
+
+CALIB_SIZE = (800, 600)   # (width, height) of the calibration images
+
+
+class Undistorter:
+    def __init__(self, K, dist, calib_size=CALIB_SIZE, calib_path=None):
+        self.K = np.asarray(K, np.float64)
+        self.dist = np.asarray(dist, np.float64).ravel()
+        self.calib_size = tuple(calib_size)
+        self.calib_path = calib_path
+
+        self._K = {}       # (w, h) → scaled camera matrix
+        self._maps = {}    # (w, h) → (map1, map2)
+
+    @classmethod
+    def from_file(cls, path, calib_size=CALIB_SIZE):
+        K, dist, *_ = load_calibration(path)
+        return cls(K, dist, calib_size, calib_path=path)
+
+    def camera_matrix(self, size):
+        """Camera matrix for a (w, h) stream, scaled from the calibration size."""
+        size = tuple(size)
+        K = self._K.get(size)
+        if K is None:
+            sx = size[0] / float(self.calib_size[0])
+            sy = size[1] / float(self.calib_size[1])
+            K = self.K.copy()
+            K[0, 0] *= sx
+            K[1, 1] *= sy
+            # Pixel centres: c_new = (c + 0.5) * s - 0.5
+            K[0, 2] = (K[0, 2] + 0.5) * sx - 0.5
+            K[1, 2] = (K[1, 2] + 0.5) * sy - 0.5
+            self._K[size] = K
+        return K
+
+    # ---------------- points ----------------
+    def undistort_points(self, pts, img_shape):
+        """
+        (N,2) distorted pixel coordinates → undistorted pixel coordinates
+        (P = K, so the pixel scale is unchanged).
+        """
+        pts = np.asarray(pts, np.float64).reshape(-1, 1, 2)
+        if len(pts) == 0:
+            return pts.reshape(0, 2)
+
+        K = self.camera_matrix((img_shape[1], img_shape[0]))
+        out = cv2.undistortPoints(pts, K, self.dist, P=K)
+        return out.reshape(-1, 2)
+
+    # ---------------- full frames ----------------
+    def _cache_path(self, size):
+        if self.calib_path is None:
+            return None
+        base = os.path.splitext(self.calib_path)[0]
+        return f"{base}_undistort_{size[0]}x{size[1]}.npz"
+
+    def _cache_key(self, size):
+        h = hashlib.sha1()
+        h.update(self.K.tobytes())
+        h.update(self.dist.tobytes())
+        h.update(np.asarray(size + self.calib_size, np.int64).tobytes())
+        return h.hexdigest()
+
+    def maps(self, size):
+        """(map1, map2) fixed-point remap tables for a (w, h) stream."""
+        size = tuple(size)
+        maps = self._maps.get(size)
+        if maps is not None:
+            return maps
+
+        path = self._cache_path(size)
+        key = self._cache_key(size)
+
+        if path is not None and os.path.isfile(path):
+            data = np.load(path)
+            if str(data["key"]) == key:
+                maps = (data["map1"], data["map2"])
+
+        if maps is None:
+            K = self.camera_matrix(size)
+            maps = cv2.initUndistortRectifyMap(K, self.dist, None, K, size, cv2.CV_16SC2)
+            if path is not None:
+                try:
+                    np.savez(path, map1=maps[0], map2=maps[1], key=key)
+                except OSError:
+                    pass   # read-only calibration folder: keep in memory only
+
+        self._maps[size] = maps
+        return maps
+
+    def rectify(self, img):
+        """Undistorted copy of a frame (visualisation only)."""
+        map1, map2 = self.maps((img.shape[1], img.shape[0]))
+        return cv2.remap(img, map1, map2, cv2.INTER_LINEAR)
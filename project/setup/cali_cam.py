@@ -9,10 +9,12 @@ PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
 sys.path.append(PROJECT_ROOT)
 
 from model.bundle import build_checkerboard
+from model.corner_cache import CornerCache, content_hash, detect_corners
+from utils.stream import LatestFrameGrabber
 
 STREAM_URL = "http://192.168.4.35/high-quality-stream"
 
-BASE_DIR = "../data/CALI"
+BASE_DIR = os.path.join(PROJECT_ROOT, "data", "CALI")
 CAPTURE_DIR = os.path.join(BASE_DIR, "cali_images")
 BLURRY_DIR = os.path.join(BASE_DIR, "cali_blurry")
 NOISY_DIR = os.path.join(BASE_DIR, "cali_noisy")
@@ -34,10 +36,21 @@ def reset_calibration_folders():
     print("Calibration directories ready.")
 
 
-def detect_checkerboard(gray, pattern):
-    """Return True, corners if found else False, None."""
-    found, corners = cv2.findChessboardCorners(gray, pattern)
-    return found, corners
+def save_capture(filename, frame, jpeg, gray, raw, sub, cache):
+    """
+    Writes the stream's own JPEG bytes when available (no re-encode, so the
+    saved file decodes to exactly the frame the board was found in) and
+    records its corners in the cache, so gen_cali / bundle skip detection.
+    """
+    if jpeg is None:
+        cv2.imwrite(filename, frame)
+        return
+
+    data = bytes(jpeg)
+    with open(filename, "wb") as f:
+        f.write(data)
+
+    cache.put(content_hash(data), CHECKERBOARD, True, gray.shape[::-1], raw, sub)
 
 
 def capture_calibration_images():
@@ -48,26 +61,32 @@ def capture_calibration_images():
     print(f"Ready to capture {MAX_IMAGES} calibration images...")
     print("Move the checkerboard into view.")
 
-    cap = cv2.VideoCapture(STREAM_URL)
+    cache = CornerCache.for_images(CAPTURE_DIR)
+
+    cap = LatestFrameGrabber(STREAM_URL, native=True)
     if not cap.isOpened():
         print("Cannot open ESP32 stream.")
         return
+    cap.start()
 
     saved = 0
 
     while saved < MAX_IMAGES:
-        ret, frame = cap.read()
+        ret, frame = cap.read_latest()
         if not ret:
-            print("⚠ No frame received.")
+            # No new frame yet
+            if cv2.waitKey(1) & 0xFF == ord("q"):
+                break
             continue
 
         gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
 
-        found, corners = detect_checkerboard(gray, CHECKERBOARD)
+        # Same recipe (pattern, flags, sub-pixel refinement) as gen_cali
+        found, raw, sub = detect_corners(gray, CHECKERBOARD)
 
         if found:
             filename = os.path.join(CAPTURE_DIR, f"calib_{saved:02d}.jpg")
-            cv2.imwrite(filename, frame)
+            save_capture(filename, frame, cap.jpeg, gray, raw, sub, cache)
             print(f"Saved: {filename}")
             saved += 1
 
@@ -77,6 +96,7 @@ def capture_calibration_images():
 
     cap.release()
     cv2.destroyAllWindows()
+    cache.save()
 
     print("Calibration capture complete!")
 
@@ -1,32 +1,307 @@
-import subprocess
+"""
+cali_pipeline.py
+
+Calibration pipeline (capture → clean → preprocess → calibrate) run in one
+process, the stages as functions over one in-memory dataset:
+    - Dataset  : the images of cali_images, each read once and decoded
+                 only when a stage needs it, with its content hash
+    - Manifest : data/CALI/manifest.json — per image its hash, blur / noise
+                 scores and status, per stage its input key, outputs
+                 (with hashes), last run time and the time of this run
+    - run_stage: skips a stage whose input key matches the manifest and
+                 whose outputs are still intact
+
+Cleaning does not move files: rejected images stay in cali_images and are
+only marked "blurry" / "noisy" in the manifest.
+"""
+
+import argparse
+import hashlib
+import json
 import os
+import sys
+import time
+
+import cv2
+import numpy as np
 
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 PROJECT_ROOT = os.path.abspath(os.path.join(SCRIPT_DIR, ".."))
 
-scripts = [
-    os.path.join(SCRIPT_DIR, "cali_cam.py"),
-    os.path.join(SCRIPT_DIR, "clean.py"),
-    os.path.join(SCRIPT_DIR, "preprocess.py"),
-    os.path.join(SCRIPT_DIR, "gen_cali.py"),
-]
+sys.path.append(PROJECT_ROOT)
 
-# PIPELINE EXECUTION
-for script in scripts:
-    print("\n==============================")
-    print(f" Running {os.path.basename(script)} ...")
-    print("==============================\n")
+import clean
+import gen_cali
+import preprocess
+from model.calibration_data import save_calibration
+from model.corner_cache import CornerCache, content_hash, file_hash
 
-    result = subprocess.run(["python3", script])
+DATA_DIR = os.path.join(PROJECT_ROOT, "data", "CALI")
 
-    if result.returncode != 0:
-        print(f"\nERROR: {os.path.basename(script)} failed (exit code {result.returncode}).")
-        print("Stopping pipeline.\n")
-        break
+IMAGE_DIR = os.path.join(DATA_DIR, "cali_images")
+BW_DIR = os.path.join(DATA_DIR, "cali_bw")
+CALIB_PATH = os.path.join(DATA_DIR, "calibration", "calibration_data.npz")
+MANIFEST_PATH = os.path.join(DATA_DIR, "manifest.json")
+
+
+class StageFailed(RuntimeError):
+    pass
+
+
+# ============================================================
+# 1. Dataset and manifest
+# ============================================================
+class Dataset:
+    """Images of one folder (sorted), read once; decoded on first use."""
+
+    def __init__(self, image_dir):
+        self.image_dir = image_dir
+        self.names = sorted(f for f in os.listdir(image_dir) if f.lower().endswith(".jpg"))
+        self.paths = {name: os.path.join(image_dir, name) for name in self.names}
+
+        self._data = {}
+        self.hashes = {}
+        for name in self.names:
+            with open(self.paths[name], "rb") as f:
+                self._data[name] = f.read()
+            self.hashes[name] = content_hash(self._data[name])
+
+        self._bgr = {}
+        self._gray = {}
+        self.decoded = 0
+
+    def bgr(self, name):
+        if name not in self._bgr:
+            buf = np.frombuffer(self._data[name], np.uint8)
+            self._bgr[name] = cv2.imdecode(buf, cv2.IMREAD_COLOR)
+            self.decoded += 1
+        return self._bgr[name]
+
+    def gray(self, name):
+        """Decoded straight to gray, like the scoring in utils/find_blur and find_noise."""
+        if name not in self._gray:
+            buf = np.frombuffer(self._data[name], np.uint8)
+            self._gray[name] = cv2.imdecode(buf, cv2.IMREAD_GRAYSCALE)
+            self.decoded += 1
+        return self._gray[name]
+
+    def key(self, names, *params):
+        """Input key of a stage: the content of `names` plus its parameters."""
+        return stage_key([(n, self.hashes[n]) for n in names], *params)
+
+
+def stage_key(*parts):
+    return hashlib.sha1(json.dumps(parts, sort_keys=True).encode()).hexdigest()
+
+
+class Manifest:
+    def __init__(self, path):
+        self.path = path
+        self.root = os.path.dirname(path)
+        self.images = {}
+        self.stages = {}
+
+        if os.path.isfile(path):
+            with open(path) as f:
+                data = json.load(f)
+            self.images = data.get("images", {})
+            self.stages = data.get("stages", {})
+
+    def image(self, name, digest):
+        """Per-image record; reset when the image content changed."""
+        rec = self.images.get(name)
+        if rec is None or rec.get("hash") != digest:
+            rec = self.images[name] = {"hash": digest}
+        return rec
+
+    def rel(self, path):
+        return os.path.relpath(path, self.root)
+
+    def outputs_intact(self, rec):
+        for rel, digest in rec.get("outputs", {}).items():
+            path = os.path.join(self.root, rel)
+            if not os.path.isfile(path) or file_hash(path) != digest:
+                return False
+        return True
+
+    def save(self):
+        tmp = self.path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump({"images": self.images, "stages": self.stages}, f, indent=2)
+        os.replace(tmp, self.path)
+
+
+def run_stage(manifest, name, key, fn, force=False):
+    """
+    fn() → (result, output paths); result must be JSON-serialisable.
+    Returns the result, from the manifest if the stage was skipped.
+    """
+    print(f"\n=== {name} ===")
+    t0 = time.perf_counter()
+
+    rec = manifest.stages.get(name)
+    if not force and rec is not None and rec["key"] == key and manifest.outputs_intact(rec):
+        rec["skipped"] = True
+        rec["seconds"] = time.perf_counter() - t0
+        print(f"↷ Skipped: inputs unchanged (last run took {rec['run_seconds']:.2f}s)")
+        return rec["result"]
+
+    result, outputs = fn()
+    seconds = time.perf_counter() - t0
+    manifest.stages[name] = {
+        "key": key,
+        "result": result,
+        "outputs": {manifest.rel(p): file_hash(p) for p in outputs},
+        "skipped": False,
+        "seconds": seconds,
+        "run_seconds": seconds,
+        "finished": time.strftime("%Y-%m-%d %H:%M:%S"),
+    }
+    print(f"✔ Finished {name} in {seconds:.2f}s")
+    return result
 
-    print(f"✔ Finished: {os.path.basename(script)}\n")
 
-else:
+# ============================================================
+# 2. Stages
+# ============================================================
+def stage_clean(dataset, manifest):
+    """Blur / noise scores (cached per image content) → per-image status."""
+    scores = {}
+    computed = 0
+    for name in dataset.names:
+        rec = manifest.image(name, dataset.hashes[name])
+        if "blur" not in rec:
+            gray = dataset.gray(name)
+            if gray is None:
+                print(f"Could not open {dataset.paths[name]}")
+                continue
+            rec["blur"], rec["noise"] = (float(v) for v in clean.image_scores(gray))
+            computed += 1
+        scores[name] = (rec["blur"], rec["noise"])
+
+    status, threshold = clean.classify_images(scores)
+    for name, s in status.items():
+        manifest.images[name]["status"] = s
+
+    counts = {s: list(status.values()).count(s) for s in ("ok", "blurry", "noisy")}
+    print(f"Scored {computed} new image(s); kept {counts['ok']}, "
+          f"blurry {counts['blurry']}, noisy {counts['noisy']}")
+    return {"status": status, "noise_threshold": threshold}, []
+
+
+def stage_preprocess(dataset, manifest, kept, out_dir=BW_DIR):
+    """BW copies of the kept images; unchanged images are not redone."""
+    os.makedirs(out_dir, exist_ok=True)
+    outputs = []
+    written = 0
+
+    for name in kept:
+        rec = manifest.images[name]
+        path = os.path.join(out_dir, name)
+        if rec.get("bw") != rec["hash"] or not os.path.isfile(path):
+            cv2.imwrite(path, preprocess.preprocess_bw(dataset.bgr(name)))
+            rec["bw"] = rec["hash"]
+            written += 1
+        outputs.append(path)
+
+    # BW images of rejected / deleted images are stale
+    for name in os.listdir(out_dir):
+        if name.lower().endswith(".jpg") and name not in kept:
+            os.remove(os.path.join(out_dir, name))
+
+    print(f"Preprocessed {written} image(s), {len(kept) - written} unchanged")
+    return {"written": written}, outputs
+
+
+def stage_calibrate(dataset, manifest, kept, out_path=CALIB_PATH, workers=None):
+    """Chessboard corners (shared CornerCache) + calibrateCamera on the kept images."""
+    cache = CornerCache.for_images(dataset.image_dir)
+    results = gen_cali.detect_all(
+        [dataset.paths[n] for n in kept], workers=workers, verbose=False,
+        cache=cache, digests=[dataset.hashes[n] for n in kept]
+    )
+    print(f"Corner cache: {cache.hits} hit(s), {cache.misses} detected")
+
+    calib = gen_cali.calibrate(results)
+    if calib is None:
+        raise StageFailed("no valid chessboard detections")
+
+    mtx, dist, rvecs, tvecs = calib
+    save_calibration(out_path, K=mtx, dist=dist, rvecs=rvecs, tvecs=tvecs)
+    print(f"Saved calibration to:\n  {out_path}")
+    return {"views": len(rvecs)}, [out_path]
+
+
+# ============================================================
+# 3. Pipeline
+# ============================================================
+def run_pipeline(capture=False, workers=None, force=False):
+    if capture:
+        import cali_cam
+
+        print("\n=== capture ===")
+        cali_cam.capture_calibration_images()
+
+    # Images moved out by the old file-based clean.py go back once
+    clean.restore_images(clean.BLUR_OUT_DIR, IMAGE_DIR)
+    clean.restore_images(clean.NOISE_OUT_DIR, IMAGE_DIR)
+
+    dataset = Dataset(IMAGE_DIR)
+    if not dataset.names:
+        raise StageFailed(f"no images in {IMAGE_DIR}, run with --capture")
+    print(f"Dataset: {len(dataset.names)} images in {IMAGE_DIR}")
+
+    manifest = Manifest(MANIFEST_PATH)
+    manifest.images = {n: r for n, r in manifest.images.items() if n in dataset.hashes}
+
+    try:
+        cleaned = run_stage(
+            manifest, "clean",
+            dataset.key(dataset.names, clean.BLUR_THRESHOLD, clean.NOISE_MULTIPLIER),
+            lambda: stage_clean(dataset, manifest), force
+        )
+        kept = [n for n in dataset.names if cleaned["status"].get(n) == "ok"]
+
+        run_stage(
+            manifest, "preprocess", dataset.key(kept),
+            lambda: stage_preprocess(dataset, manifest, kept), force
+        )
+        run_stage(
+            manifest, "calibrate", dataset.key(kept, gen_cali.CHECKERBOARD),
+            lambda: stage_calibrate(dataset, manifest, kept, workers=workers), force
+        )
+    finally:
+        manifest.save()
+
+    return manifest, dataset
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Calibration pipeline")
+    parser.add_argument("--capture", action="store_true",
+                        help="capture a new image set first (resets the image folders)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(),
+                        help="chessboard detection processes (1 = serial)")
+    parser.add_argument("--force", action="store_true",
+                        help="run every stage even if its inputs are unchanged")
+    args = parser.parse_args()
+
+    try:
+        manifest, dataset = run_pipeline(args.capture, args.workers, args.force)
+    except StageFailed as e:
+        print(f"\nERROR: {e}")
+        print("Stopping pipeline.\n")
+        sys.exit(1)
+
     print("\n=======================================")
     print(" CALIBRATION PIPELINE IS COMPLETED  ")
-    print("=======================================\n")
+    print("=======================================")
+    for name, rec in manifest.stages.items():
+        state = "skipped" if rec["skipped"] else "ran"
+        print(f"  {name:<11s} {state:<8s} {rec['seconds']:7.2f}s")
+    print(f"  image decodes: {dataset.decoded} ({len(dataset.names)} images)")
+    print(f"Manifest: {MANIFEST_PATH}\n")
+
+
+if __name__ == "__main__":
+    main()
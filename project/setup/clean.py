@@ -2,11 +2,14 @@ import os
 import shutil
 import sys
 
+import cv2
+import numpy as np
+
 ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
 sys.path.append(ROOT_DIR)
 
 from utils.find_blur import remove_blurry_images
-from utils.find_noise import compute_noise_threshold, remove_noisy_images
+from utils.find_noise import compute_noise_threshold, noise_score, remove_noisy_images
 
 
 DATA_DIR = os.path.join(ROOT_DIR, "data", "CALI")
@@ -15,8 +18,8 @@ IMAGE_DIR     = os.path.join(DATA_DIR, "cali_images")
 BLUR_OUT_DIR  = os.path.join(DATA_DIR, "cali_blurry")
 NOISE_OUT_DIR = os.path.join(DATA_DIR, "cali_noisy")
 
-for folder in [IMAGE_DIR, BLUR_OUT_DIR, NOISE_OUT_DIR]:
-    os.makedirs(folder, exist_ok=True)
+BLUR_THRESHOLD = 120.0
+NOISE_MULTIPLIER = 1.10
 
 
 def restore_images(src_dir, dest_dir):
@@ -34,18 +37,53 @@ def restore_images(src_dir, dest_dir):
         print(f"Restored {restored} images from {src_dir} → {dest_dir}")
 
 
-restore_images(BLUR_OUT_DIR, IMAGE_DIR)
-restore_images(NOISE_OUT_DIR, IMAGE_DIR)
+# IN-MEMORY CLEANING (used by cali_pipeline, no files are moved)
+def image_scores(gray):
+    """(blur, noise) of one grayscale image: Laplacian variance, residual std."""
+    return cv2.Laplacian(gray, cv2.CV_64F).var(), noise_score(gray)
+
+
+def classify_images(scores, blur_threshold=BLUR_THRESHOLD,
+                    noise_multiplier=NOISE_MULTIPLIER):
+    """
+    scores: {name: (blur, noise)} → ({name: "ok" | "blurry" | "noisy"},
+    noise threshold). Same rules as the file-moving script: blurry images
+    are dropped first, the noise threshold is taken over the sharp ones.
+    """
+    status = {name: "blurry" if blur < blur_threshold else "ok"
+              for name, (blur, _) in scores.items()}
+
+    sharp = [scores[name][1] for name, s in status.items() if s == "ok"]
+    if not sharp:
+        return status, None
+
+    threshold = float(np.mean(sharp)) * noise_multiplier
+    for name, s in status.items():
+        if s == "ok" and scores[name][1] > threshold:
+            status[name] = "noisy"
+    return status, threshold
+
+
+# FILE-BASED CLEANING (standalone script)
+def main():
+    for folder in [IMAGE_DIR, BLUR_OUT_DIR, NOISE_OUT_DIR]:
+        os.makedirs(folder, exist_ok=True)
+
+    restore_images(BLUR_OUT_DIR, IMAGE_DIR)
+    restore_images(NOISE_OUT_DIR, IMAGE_DIR)
+
+    print("\nRemoving blurry images...")
+    remove_blurry_images(IMAGE_DIR, BLUR_OUT_DIR, threshold=BLUR_THRESHOLD)
 
-print("\nRemoving blurry images...")
-remove_blurry_images(IMAGE_DIR, BLUR_OUT_DIR, threshold=120.0)
+    print("\nCalculating noise threshold...")
+    threshold, avg, _ = compute_noise_threshold(IMAGE_DIR, multiplier=NOISE_MULTIPLIER)
+    print(f"➡ Noise threshold = {threshold:.2f}")
 
-print("\nCalculating noise threshold...")
-threshold, avg, _ = compute_noise_threshold(IMAGE_DIR, multiplier=1.10)
-print(f"➡ Noise threshold = {threshold:.2f}")
+    print("\nRemoving noisy images...")
+    remove_noisy_images(IMAGE_DIR, NOISE_OUT_DIR, threshold)
 
-print("\nRemoving noisy images...")
-remove_noisy_images(IMAGE_DIR, NOISE_OUT_DIR, threshold)
+    print("\nCleaning process complete!")
 
 
-print("\nCleaning process complete!")
+if __name__ == "__main__":
+    main()
@@ -2,6 +2,9 @@ import cv2
 import numpy as np
 import glob
 import sys, os
+import argparse
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
 
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 ROOT_DIR   = os.path.abspath(os.path.join(SCRIPT_DIR, ".."))
@@ -9,71 +12,202 @@ ROOT_DIR   = os.path.abspath(os.path.join(SCRIPT_DIR, ".."))
 sys.path.append(ROOT_DIR)
 
 from model.calibration_data import save_calibration
+from model.corner_cache import CornerCache, decode_gray, detect_corners, file_hash
 
 # FIX PROJECT ROOT DIRECTORY
-SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
-ROOT_DIR = os.path.abspath(os.path.join(SCRIPT_DIR, ".."))
 DATA_DIR = os.path.join(ROOT_DIR, "data", "CALI")
 
 IMAGE_DIR = os.path.join(DATA_DIR, "cali_images", "*.jpg")
 CALIB_DIR = os.path.join(DATA_DIR, "calibration")
 CALIB_PATH = os.path.join(CALIB_DIR, "calibration_data.npz")
 
-os.makedirs(CALIB_DIR, exist_ok=True)
-
 CHECKERBOARD = (9, 6)
-criteria = (cv2.TERM_CRITERIA_EPS + cv2.TERM_CRITERIA_MAX_ITER, 30, 0.001)
 
 # Object points for checkerboard (3D world)
 objp = np.zeros((CHECKERBOARD[0] * CHECKERBOARD[1], 3), np.float32)
 objp[:, :2] = np.mgrid[0:CHECKERBOARD[0], 0:CHECKERBOARD[1]].T.reshape(-1, 2)
 
-objpoints = []  # 3D
-imgpoints = []  # 2D
-
-# REMOVE OLD CALIBRATION FILE
-if os.path.exists(CALIB_PATH):
-    os.remove(CALIB_PATH)
-    print(f"Removed existing calibration file: {CALIB_PATH}")
-
-# LOAD IMAGES
-images = glob.glob(IMAGE_DIR)
-print(f"Found {len(images)} calibration images in:\n  {IMAGE_DIR}")
 
-if len(images) == 0:
-    print("ERROR: No images found. Run cali_cam.py first.")
-    exit()
+# DETECTION (one image; runs in the worker processes)
+def detect_chessboard(fname, pattern=CHECKERBOARD):
+    """
+    Returns (fname, image_size, raw, corners): image_size is None if the
+    image could not be read, raw / corners (refined with cornerSubPix)
+    None if no board.
+    """
+    with open(fname, "rb") as f:
+        gray = decode_gray(f.read())
+    if gray is None:
+        return fname, None, None, None
 
-# PROCESS EACH IMAGE
-for fname in images:
-    img = cv2.imread(fname)
-    if img is None:
-        print(f"Could not open: {fname}")
-        continue
+    found, raw, corners = detect_corners(gray, pattern)
+    return fname, gray.shape[::-1], raw, corners
 
-    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
 
-    found, corners = cv2.findChessboardCorners(gray, CHECKERBOARD, None)
-    if found:
-        corners2 = cv2.cornerSubPix(gray, corners, (11, 11), (-1, -1), criteria)
+def _init_worker():
+    # One OpenCV thread per process, the pool provides the parallelism
+    cv2.setNumThreads(1)
 
-        objpoints.append(objp)
-        imgpoints.append(corners2)
 
-        print(f"✔ Chessboard detected: {os.path.basename(fname)}")
+def _report(done, total, result, cached=False):
+    fname, size, corners = result
+    name = os.path.basename(fname)
+    tag = " (cached)" if cached else ""
+    if size is None:
+        print(f"[{done}/{total}] Could not open: {fname}")
+    elif corners is not None:
+        print(f"[{done}/{total}] ✔ Chessboard detected: {name}{tag}")
     else:
-        print(f"✖ Chessboard NOT detected: {os.path.basename(fname)}")
+        print(f"[{done}/{total}] ✖ Chessboard NOT detected: {name}{tag}")
+
+
+def detect_all(images, workers=None, verbose=True, cache=None, pattern=CHECKERBOARD,
+               digests=None):
+    """
+    Chessboard detection over every image, serially (workers=1) or on a
+    process pool. Images whose content is already in `cache` (a
+    CornerCache) are not detected again, new detections are added to it;
+    `digests` are the images' content hashes if the caller has them.
+    Results (fname, image_size, corners) come back in the order of
+    `images` regardless of completion order.
+    """
+    total = len(images)
+    results = [None] * total
+    done = 0
+
+    # Cache lookups in this process; only the misses go to the workers
+    todo = []
+    for i, fname in enumerate(images):
+        digest = entry = None
+        if cache is not None:
+            digest = digests[i] if digests is not None else file_hash(fname)
+            entry = cache.get(digest, pattern)
+        if entry is None:
+            todo.append((i, fname, digest))
+            continue
+
+        _, size, _, corners = entry
+        results[i] = (fname, size, corners)
+        done += 1
+        if verbose:
+            _report(done, total, results[i], cached=True)
+
+    def collect(i, digest, result):
+        fname, size, raw, corners = result
+        results[i] = (fname, size, corners)
+        if cache is not None and size is not None:
+            cache.put(digest, pattern, corners is not None, size, raw, corners)
+
+    if workers == 1 or len(todo) <= 1:
+        for i, fname, digest in todo:
+            collect(i, digest, detect_chessboard(fname, pattern))
+            done += 1
+            if verbose:
+                _report(done, total, results[i])
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+            futures = {pool.submit(detect_chessboard, fname, pattern): (i, digest)
+                       for i, fname, digest in todo}
+            for future in as_completed(futures):
+                i, digest = futures[future]
+                collect(i, digest, future.result())
+                done += 1
+                if verbose:
+                    _report(done, total, results[i])
+
+    if cache is not None:
+        cache.save()
+    return results
+
+
+# CALIBRATION
+def calibrate(results):
+    """calibrateCamera on the detections, in image order. None if none found."""
+    objpoints = []  # 3D
+    imgpoints = []  # 2D
+    image_size = None
+
+    for fname, size, corners in results:
+        if size is not None:
+            image_size = size
+        if corners is not None:
+            objpoints.append(objp)
+            imgpoints.append(corners)
+
+    if not objpoints:
+        return None
+
+    print(f"\n🔧 Performing camera calibration on {len(imgpoints)} views...")
 
-# PERFORM CALIBRATION
-if objpoints and imgpoints:
-    print("\n🔧 Performing camera calibration...")
-    
     ret, mtx, dist, rvecs, tvecs = cv2.calibrateCamera(
-        objpoints, imgpoints, gray.shape[::-1], None, None
+        objpoints, imgpoints, image_size, None, None
     )
-
+    print(f"RMS reprojection error: {ret:.4f} px")
+    return mtx, dist, rvecs, tvecs
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Checkerboard camera calibration")
+    parser.add_argument("--images", default=IMAGE_DIR, help="glob of calibration images")
+    parser.add_argument("--out", default=CALIB_PATH)
+    parser.add_argument("--workers", type=int, default=os.cpu_count(),
+                        help="detection processes (1 = serial)")
+    parser.add_argument("--compare", action="store_true",
+                        help="also run detection serially and report the speedup "
+                             "(both passes detect every image, the cache is not used)")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="ignore the chessboard-corner cache next to the images")
+    args = parser.parse_args()
+
+    os.makedirs(os.path.dirname(args.out), exist_ok=True)
+
+    # REMOVE OLD CALIBRATION FILE
+    if os.path.exists(args.out):
+        os.remove(args.out)
+        print(f"Removed existing calibration file: {args.out}")
+
+    # LOAD IMAGES (sorted: the same order for every run and worker count)
+    images = sorted(glob.glob(args.images))
+    print(f"Found {len(images)} calibration images in:\n  {args.images}")
+
+    if len(images) == 0:
+        print("ERROR: No images found. Run cali_cam.py first.")
+        sys.exit(1)
+
+    # PROCESS EACH IMAGE (corners already found by cali_cam or an earlier
+    # run come from the cache). --compare times real detection on both
+    # sides, so it bypasses the cache
+    cache = None if args.no_cache or args.compare else CornerCache.for_images(args.images)
+
+    t0 = time.perf_counter()
+    results = detect_all(images, workers=args.workers, cache=cache)
+    t_detect = time.perf_counter() - t0
+    print(f"\nDetection: {t_detect:.2f}s with {args.workers} worker(s)")
+    if cache is not None:
+        print(f"Corner cache: {cache.hits} hit(s), {cache.misses} detected → {cache.path}")
+
+    if args.compare and args.workers != 1:
+        t0 = time.perf_counter()
+        serial = detect_all(images, workers=1, verbose=False)
+        t_serial = time.perf_counter() - t0
+
+        same = all(
+            a[1] == b[1] and (a[2] is None) == (b[2] is None)
+            and (a[2] is None or np.array_equal(a[2], b[2]))
+            for a, b in zip(results, serial)
+        )
+        print(f"Serial detection: {t_serial:.2f}s → speedup {t_serial / t_detect:.2f}x "
+              f"({'identical' if same else 'DIFFERENT'} calibration inputs)")
+
+    # PERFORM CALIBRATION
+    calib = calibrate(results)
+    if calib is None:
+        print("\nCalibration failed — no valid chessboard detections.")
+        sys.exit(1)
+
+    mtx, dist, rvecs, tvecs = calib
     save_calibration(
-        CALIB_PATH,
+        args.out,
         K=mtx,
         dist=dist,
         rvecs=rvecs,
@@ -81,7 +215,8 @@ if objpoints and imgpoints:
     )
 
     print("\nCalibration SUCCESSFUL!")
-    print(f"Saved full calibration (intrinsics + extrinsics) to:\n  {CALIB_PATH}")
+    print(f"Saved full calibration (intrinsics + extrinsics) to:\n  {args.out}")
+
 
-else:
-    print("\nCalibration failed — no valid chessboard detections.")
+if __name__ == "__main__":
+    main()
@@ -51,23 +51,29 @@ DATA_DIR = os.path.join(ROOT_DIR, "data", "CALI")
 INPUT_DIR = os.path.join(DATA_DIR, "cali_images")
 OUTPUT_DIR = os.path.join(DATA_DIR, "cali_bw")
 
-os.makedirs(OUTPUT_DIR, exist_ok=True)
 
-image_paths = glob.glob(os.path.join(INPUT_DIR, "*.jpg"))
+def preprocess_dir(input_dir=INPUT_DIR, output_dir=OUTPUT_DIR):
+    os.makedirs(output_dir, exist_ok=True)
 
-print(f"Processing {len(image_paths)} images from:\n  {INPUT_DIR}")
+    image_paths = glob.glob(os.path.join(input_dir, "*.jpg"))
 
-for path in image_paths:
-    img = cv2.imread(path)
-    if img is None:
-        print(f"Could not open {path}")
-        continue
+    print(f"Processing {len(image_paths)} images from:\n  {input_dir}")
 
-    bw_img = preprocess_bw(img)
-    filename = os.path.basename(path)
-    save_path = os.path.join(OUTPUT_DIR, filename)
+    for path in image_paths:
+        img = cv2.imread(path)
+        if img is None:
+            print(f"Could not open {path}")
+            continue
 
-    cv2.imwrite(save_path, bw_img)
-    print(f"Saved BW: {save_path}")
+        bw_img = preprocess_bw(img)
+        filename = os.path.basename(path)
+        save_path = os.path.join(output_dir, filename)
 
-print("\nBatch preprocessing complete!")
+        cv2.imwrite(save_path, bw_img)
+        print(f"Saved BW: {save_path}")
+
+    print("\nBatch preprocessing complete!")
+
+
+if __name__ == "__main__":
+    preprocess_dir()
@@ -0,0 +1,33 @@
+import os
+import sys
+
+import cv2
+import numpy as np
+import pytest
+
+# Tests import the project packages (model, utils) like the app scripts do,
+# from the project root; setup scripts import each other as siblings
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, PROJECT_ROOT)
+sys.path.insert(0, os.path.join(PROJECT_ROOT, "setup"))
+
+
+@pytest.fixture
+def standin(tmp_path):
+    """
+    Local ESP32 stand-in (analysis/esp32_standin.py) serving 3 distinct
+    frames at 100 fps. Yields (base_url, {endpoint: [jpeg bytes]}).
+    """
+    from analysis.esp32_standin import load_jpegs, serve_in_background
+
+    for i in range(3):
+        img = np.full((300, 400, 3), 60 * i, np.uint8)
+        cv2.putText(img, str(i), (150, 200), cv2.FONT_HERSHEY_SIMPLEX, 4, (255, 255, 255), 8)
+        cv2.imwrite(str(tmp_path / f"frame_{i}.jpg"), img)
+
+    server, base_url = serve_in_background(str(tmp_path), fps=100.0)
+    try:
+        yield base_url, load_jpegs(str(tmp_path))
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,74 @@
+import os
+
+from cali_pipeline import Dataset, Manifest, run_stage
+
+
+def make_stage(path, calls):
+    """Stage writing one output file; counts its runs in calls."""
+    def fn():
+        calls.append(1)
+        with open(path, "w") as f:
+            f.write(f"run {len(calls)}")
+        return {"runs": len(calls)}, [path]
+    return fn
+
+
+def test_run_stage_skips_unchanged_and_reruns_on_change(tmp_path):
+    manifest = Manifest(str(tmp_path / "manifest.json"))
+    out = str(tmp_path / "out.txt")
+    calls = []
+    fn = make_stage(out, calls)
+
+    assert run_stage(manifest, "stage", "key-1", fn) == {"runs": 1}
+    assert not manifest.stages["stage"]["skipped"]
+
+    # Same key, outputs intact → skipped, cached result
+    assert run_stage(manifest, "stage", "key-1", fn) == {"runs": 1}
+    assert manifest.stages["stage"]["skipped"]
+    assert len(calls) == 1
+
+    # Changed inputs → re-run
+    assert run_stage(manifest, "stage", "key-2", fn) == {"runs": 2}
+
+    # Output edited or deleted behind the pipeline's back → re-run
+    with open(out, "w") as f:
+        f.write("edited")
+    assert run_stage(manifest, "stage", "key-2", fn) == {"runs": 3}
+    os.remove(out)
+    assert run_stage(manifest, "stage", "key-2", fn) == {"runs": 4}
+
+    # force always runs
+    assert run_stage(manifest, "stage", "key-2", fn, force=True) == {"runs": 5}
+
+
+def test_manifest_round_trip_keeps_skip(tmp_path):
+    path = str(tmp_path / "manifest.json")
+    out = str(tmp_path / "out.txt")
+    calls = []
+
+    manifest = Manifest(path)
+    run_stage(manifest, "stage", "key", make_stage(out, calls))
+    manifest.save()
+
+    reloaded = Manifest(path)
+    assert run_stage(reloaded, "stage", "key", make_stage(out, calls)) == {"runs": 1}
+    assert len(calls) == 1
+    assert reloaded.stages["stage"]["outputs"] == manifest.stages["stage"]["outputs"]
+
+
+def test_dataset_key_follows_image_content(tmp_path):
+    images = tmp_path / "images"
+    images.mkdir()
+    (images / "a.jpg").write_bytes(b"first")
+    (images / "b.jpg").write_bytes(b"second")
+    (images / "notes.txt").write_bytes(b"ignored")
+
+    dataset = Dataset(str(images))
+    assert dataset.names == ["a.jpg", "b.jpg"]
+    key = dataset.key(dataset.names, 120.0)
+
+    assert Dataset(str(images)).key(dataset.names, 120.0) == key
+    assert dataset.key(dataset.names, 150.0) != key     # parameters count
+
+    (images / "b.jpg").write_bytes(b"changed")
+    assert Dataset(str(images)).key(dataset.names, 120.0) != key
@@ -0,0 +1,172 @@
+import math
+
+import cv2
+import numpy as np
+import pytest
+
+from model.corners import (
+    LINE_BACKENDS,
+    CornerDetector,
+    classify_lines,
+    detect_4_corners_pyramid,
+    filter_lines,
+    intersect_lines,
+    merge_lines,
+    quad_support,
+)
+from model.frame import FrameContext
+
+
+def test_merge_lines_joins_collinear_fragments():
+    # Two fragments of one horizontal edge (1 px apart) and a separate edge
+    segs = [(100, 50, 300, 50), (320, 51, 500, 51), (100, 200, 500, 200)]
+    merged, weights = merge_lines(segs, angle_tol=2.0, offset_tol=8.0)
+
+    assert len(merged) == 2
+    order = np.argsort(merged[:, 1])
+    top, bottom = merged[order]
+
+    # The merged top line spans both fragments, its support is their length
+    assert abs(min(top[0], top[2]) - 100) < 1
+    assert abs(max(top[0], top[2]) - 500) < 1
+    assert abs(weights[order][0] - (200 + 180)) < 1e-6
+    assert abs(weights[order][1] - 400) < 1e-6
+
+
+def test_merge_lines_keeps_different_angles_apart():
+    segs = [(0, 100, 400, 100), (0, 100, 400, 130)]     # ~4.3° apart
+    merged, weights = merge_lines(segs, angle_tol=2.0, offset_tol=50.0)
+    assert len(merged) == 2
+    assert len(weights) == 2
+
+
+def test_merge_lines_empty():
+    merged, weights = merge_lines(np.empty((0, 4)))
+    assert merged.shape == (0, 4)
+    assert weights.shape == (0,)
+
+
+def test_intersect_lines_rectangle():
+    horizontal = np.array([(10, 20, 90, 20), (10, 80, 90, 80)], float)
+    vertical = np.array([(20, 5, 20, 95), (70, 5, 70, 95)], float)
+
+    pts, h_idx, v_idx = intersect_lines(horizontal, vertical, return_pairs=True)
+
+    expected = {(20, 20), (70, 20), (20, 80), (70, 80)}
+    assert {tuple(np.round(p).astype(int)) for p in pts} == expected
+    assert len(h_idx) == len(v_idx) == 4
+
+
+def test_intersect_lines_drops_parallel_and_outside():
+    horizontal = np.array([(0, 10, 100, 10)], float)
+    vertical = np.array([(0, 20, 100, 20),            # parallel to the horizontal
+                         (500, 0, 500, 100)], float)  # meets it far outside
+    assert len(intersect_lines(horizontal, vertical, img_shape=(100, 100))) == 0
+    assert len(intersect_lines(horizontal, vertical)) == 1
+
+
+def test_quad_support_rectangle():
+    corners = [(20, 20), (70, 20), (70, 80), (20, 80)]
+    horizontal = np.array([(20, 20, 70, 20), (20, 80, 45, 80)], float)
+    vertical = np.array([(20, 20, 20, 80), (70, 20, 70, 80)], float)
+    support = quad_support(corners, horizontal, vertical,
+                           h_support=[50.0, 25.0], v_support=[60.0, 60.0])
+    # [top, right, bottom, left]
+    assert np.allclose(support, [1.0, 1.0, 0.5, 1.0])
+
+
+def test_detector_finds_synthetic_screen():
+    img = np.full((600, 800, 3), 40, np.uint8)
+    cv2.rectangle(img, (150, 100), (650, 450), (230, 230, 230), -1)
+
+    result = CornerDetector(refine=None, min_support=0.25).detect(img)
+
+    assert result.found
+    expected = np.array([(150, 100), (650, 100), (650, 450), (150, 450)], float)
+    assert np.abs(np.asarray(result.corners) - expected).max() <= 2.0
+    assert result.support.min() >= 0.25
+
+
+def test_frame_context_reuses_buffers_across_frames():
+    img = np.full((600, 800, 3), 40, np.uint8)
+    cv2.rectangle(img, (150, 100), (650, 450), (230, 230, 230), -1)
+    detector = CornerDetector(refine="harris")
+
+    buffers = {}
+    first = FrameContext(img, buffers)
+    gray, edges = first.gray, first.edges()
+
+    # Next frame writes into the same arrays, and detects what an ndarray does
+    flipped = np.ascontiguousarray(img[::-1])
+    second = FrameContext(flipped, buffers)
+    assert second.gray is gray and second.edges() is edges
+    assert np.array_equal(second.gray, cv2.cvtColor(flipped, cv2.COLOR_BGR2GRAY))
+    assert np.allclose(detector.detect(second).corners, detector.detect(flipped).corners)
+
+
+def test_pyramid_refines_once_to_full_resolution():
+    img = np.full((1200, 1600, 3), 40, np.uint8)
+    cv2.rectangle(img, (301, 203), (1297, 897), (230, 230, 230), -1)
+    img = cv2.GaussianBlur(img, (5, 5), 1.0)
+
+    full = CornerDetector(refine="harris").detect(img).corners
+    for level in (2, 4):
+        result = CornerDetector(refine="harris", pyramid_min_width=0,
+                                pyramid_level=level).detect(img)
+        assert result.scale == level
+        assert np.abs(np.asarray(result.corners) - np.asarray(full)).max() <= 1.0
+
+    coarse = detect_4_corners_pyramid(img, level=2, refine=None)
+    assert np.abs(np.asarray(coarse) - np.asarray(full)).max() <= 3.0   # about one low-res px
+
+
+@pytest.mark.parametrize("backend", sorted(LINE_BACKENDS))
+@pytest.mark.parametrize("light_screen", [True, False])
+@pytest.mark.parametrize("angle", [-3, 0, 3])
+def test_every_line_backend_finds_screen(backend, light_screen, angle):
+    background, screen = (40, 230) if light_screen else (230, 40)
+    img = np.full((600, 800, 3), background, np.uint8)
+    box = cv2.boxPoints(((400, 275), (500, 350), angle))
+    cv2.fillPoly(img, [box.astype(np.int32)], (screen,) * 3)
+    img = cv2.GaussianBlur(img, (5, 5), 1.0)
+
+    result = CornerDetector(refine=None, lines=backend).detect(img)
+
+    assert result.found
+    dist = np.linalg.norm(box[:, None] - np.asarray(result.corners)[None], axis=2)
+    assert dist.min(axis=1).max() <= 2.0
+
+
+def filter_lines_loop(lines, img, vertical_thresh=10, horizontal_thresh=10):
+    """The per-segment loop filter_lines replaced, as the reference."""
+    H, W = img.shape[:2]
+    horizontal, vertical = [], []
+    for line in lines:
+        x1, y1, x2, y2 = map(float, line)
+        angle = math.degrees(math.atan2(y2 - y1, x2 - x1))
+        length = math.hypot(x2 - x1, y2 - y1)
+        if abs(abs(angle) - 90) < vertical_thresh and length > H * 0.1:
+            vertical.append((x1, y1, x2, y2))
+        elif abs(angle) < horizontal_thresh and length > W * 0.1:
+            horizontal.append((x1, y1, x2, y2))
+    return horizontal, vertical
+
+
+def test_vectorised_filter_lines_matches_loop():
+    rng = np.random.default_rng(1)
+    img = np.zeros((600, 800), np.uint8)
+    # Random segments plus exact horizontals / verticals / 45° and zero-length ones
+    lines = rng.integers(0, 800, (500, 4)).tolist()
+    lines += [(10, 50, 400, 50), (400, 50, 10, 50), (30, 10, 30, 500),
+              (30, 500, 30, 10), (0, 0, 300, 300), (5, 5, 5, 5)]
+
+    assert filter_lines(lines, img) == filter_lines_loop(lines, img)
+    assert filter_lines(lines, img, 5, 20) == filter_lines_loop(lines, img, 5, 20)
+
+    # Raw HoughLinesP layout (N,1,4) int32 gives the same classes and masks
+    raw = np.asarray(lines, np.int32).reshape(-1, 1, 4)
+    horizontal, vertical, h_mask, v_mask = classify_lines(raw, img.shape)
+    ref_h, ref_v = filter_lines_loop(lines, img)
+    assert horizontal.tolist() == [list(l) for l in ref_h]
+    assert vertical.tolist() == [list(l) for l in ref_v]
+    assert not (h_mask & v_mask).any()
@@ -0,0 +1,53 @@
+import time
+
+import numpy as np
+
+from model.hand_backends import ScriptedHands, hand_pose
+from model.hand_gesture import GestureWorker, HandGestureController
+
+
+BOX = [(310, 205), (505, 210), (500, 402), (300, 395)]
+
+
+class FailingHands:
+    name = "failing"
+
+    def landmarks(self, rgb):
+        raise RuntimeError("model missing")
+
+
+def wait_for(worker, processed=0, failed=0, timeout=2.0):
+    end = time.time() + timeout
+    while time.time() < end:
+        if worker.processed >= processed and worker.failed >= failed:
+            return
+        time.sleep(0.005)
+    raise AssertionError(f"worker stalled: {worker.stats()}")
+
+
+def test_worker_matches_full_frame_fingertip_and_leaves_frame_alone():
+    frame = np.random.default_rng(0).integers(0, 255, (600, 800, 3), np.uint8)
+    before = frame.copy()
+
+    track = [hand_pose(0.4, 0.3)]
+    direct = HandGestureController(backend=ScriptedHands(track, loop=True))
+    _, expected = direct.detect_gesture(frame, box=BOX, timestamp=1.0)
+
+    with GestureWorker(HandGestureController(backend=ScriptedHands(track, loop=True))) as worker:
+        worker.submit(frame, 1.0, box=BOX)
+        wait_for(worker, processed=1)
+        assert worker.fingertip == expected
+
+    assert np.array_equal(frame, before)
+
+
+def test_worker_survives_backend_errors():
+    frame = np.zeros((120, 160, 3), np.uint8)
+
+    with GestureWorker(HandGestureController(backend=FailingHands())) as worker:
+        worker.submit(frame, 1.0)
+        wait_for(worker, failed=1)
+        worker.submit(frame, 2.0)
+        wait_for(worker, failed=2)
+        assert worker._thread.is_alive()
+        assert worker.stats()["failed"] == 2
@@ -0,0 +1,77 @@
+import time
+
+import pytest
+
+from utils.mjpeg import MJPEGStream, _parse_boundary, decode_jpeg
+from utils.stream import LatestFrameGrabber
+
+
+def test_parse_boundary():
+    # The firmware declares "--frame" and delimits parts with "--frame"
+    assert _parse_boundary("multipart/x-mixed-replace; boundary=--frame") == b"--frame"
+    assert _parse_boundary('multipart/x-mixed-replace; boundary="frame"') == b"--frame"
+    assert _parse_boundary(None) == b"--frame"
+
+
+def test_parts_come_back_byte_exact(standin):
+    base_url, encoded = standin
+    frames = encoded["/high-quality-stream"]
+
+    stream = MJPEGStream(base_url + "/high-quality-stream")
+    assert stream.isOpened()
+    try:
+        parts = [stream.read_jpeg() for _ in range(2 * len(frames))]
+    finally:
+        stream.release()
+
+    # No boundary / CRLF bytes leak into a part, and none are lost
+    assert parts == [frames[i % len(frames)] for i in range(len(parts))]
+    assert stream.frames == len(parts)
+
+
+@pytest.mark.parametrize("scale,gray,shape", [
+    (1, False, (600, 800, 3)),
+    (2, True, (300, 400)),
+    (4, False, (150, 200, 3)),
+])
+def test_reduced_decode(standin, scale, gray, shape):
+    base_url, _ = standin
+    stream = MJPEGStream(base_url + "/high-quality-stream")
+    try:
+        ret, frame = stream.read(scale=scale, gray=gray)
+    finally:
+        stream.release()
+
+    assert ret
+    assert frame.shape == shape
+
+
+def test_decode_rejects_unsupported_scale(standin):
+    _, encoded = standin
+    with pytest.raises(ValueError):
+        decode_jpeg(encoded["/low-quality-stream"][0], scale=3)
+
+
+def test_unreachable_stream_is_not_opened():
+    stream = MJPEGStream("http://127.0.0.1:9/high-quality-stream", timeout=0.5)
+    assert not stream.isOpened()
+    assert stream.read_jpeg() is None
+
+
+def test_grabber_keeps_only_the_latest_part(standin):
+    base_url, encoded = standin
+
+    with LatestFrameGrabber(base_url + "/low-quality-stream", native=True) as grabber:
+        assert grabber.raw
+        time.sleep(0.3)                 # ~30 parts arrive, none consumed
+
+        ret, jpeg = grabber.read_latest_jpeg()
+        assert ret
+        assert jpeg in encoded["/low-quality-stream"]
+        assert grabber.grabbed > 5
+        assert grabber.dropped >= grabber.grabbed - 2
+
+        # Decoded on demand, at the scale asked for
+        time.sleep(0.05)
+        ret, frame = grabber.read_latest(scale=2, gray=True)
+        assert ret and frame.shape == (240, 320)
@@ -0,0 +1,65 @@
+from utils.stream import STREAM_PIXELS, QualityController
+
+
+def simulate(controller, latency_of, seconds=120.0, fps=20.0):
+    """Feed the controller a loop whose latency depends only on the level."""
+    t = 0.0
+    levels = []
+    while t < seconds:
+        t += 1.0 / fps
+        controller.update(latency_of(controller.name), now=t)
+        levels.append(controller.name)
+    return levels
+
+
+def test_steps_down_when_behind():
+    qc = QualityController("http://cam", level="ultra")
+    levels = simulate(qc, lambda name: 0.3, seconds=20.0)
+    assert levels[-1] == "low"
+
+
+def test_steps_up_with_predicted_headroom():
+    # Pure per-pixel cost, small enough for "high" to stay well in budget
+    qc = QualityController("http://cam", level="low")
+    levels = simulate(qc, lambda name: 0.02 * STREAM_PIXELS[name] / STREAM_PIXELS["low"],
+                      seconds=20.0)
+    assert levels[-1] == "high"
+    assert qc.switches == 1
+
+
+def test_no_oscillation_between_levels():
+    # "high" has headroom by the old fixed threshold (70 ms < 75 ms), but
+    # "ultra" would be 4x the pixels: the controller must not try it
+    qc = QualityController("http://cam", level="high")
+    simulate(qc, lambda name: 0.07 * STREAM_PIXELS[name] / STREAM_PIXELS["high"])
+    assert qc.switches == 0
+
+
+def test_failed_step_up_backs_off():
+    # Fixed cost dominates, so the pixel-based prediction is too optimistic
+    # and every step up to "high" is undone
+    costs = {"low": 0.02, "high": 0.2, "ultra": 0.4}
+    qc = QualityController("http://cam", level="low", cooldown=3.0)
+    simulate(qc, lambda name: costs[name], seconds=300.0)
+
+    # Without back-off: a round trip every ~4.5 s (~130 switches). With it
+    # the waits go 3, 6, 12, 24, 48, then 60 s
+    assert qc.switches <= 20
+    assert qc.up_cooldown == qc.max_cooldown
+
+
+def test_unreachable_level_falls_back_and_backs_off():
+    # "high" always has headroom, but its stream never opens
+    qc = QualityController("http://cam", level="low", cooldown=3.0)
+    assert not qc.failed(now=0.0)       # nothing to undo yet
+
+    t = 0.0
+    while t < 300.0:
+        t += 0.05
+        if qc.update(0.01, now=t) and qc.name == "high":
+            assert qc.failed(now=t)
+            assert qc.name == "low"
+
+    assert qc.name == "low"
+    assert 1 < qc.failures <= 10
+    assert qc.up_cooldown == qc.max_cooldown
@@ -0,0 +1,122 @@
+import time
+
+import cv2
+import numpy as np
+
+from utils.replay import FrameRecorder, ReplaySource
+from utils.stream import LatestFrameGrabber
+
+
+class ScriptedCapture:
+    """
+    cv2.VideoCapture-like source: each entry of `script` is one read(),
+    a frame or None for a failed read; closed after the script.
+    """
+
+    def __init__(self, script, delay=0.0):
+        self.script = list(script)
+        self.delay = delay
+        self.pos = 0
+
+    def isOpened(self):
+        return self.pos < len(self.script)
+
+    def read(self):
+        if self.pos >= len(self.script):
+            return False, None
+        item = self.script[self.pos]
+        self.pos += 1
+        time.sleep(self.delay)
+        return item is not None, item
+
+    def release(self):
+        pass
+
+
+def wait_until(predicate, timeout=2.0):
+    end = time.time() + timeout
+    while time.time() < end:
+        if predicate():
+            return True
+        time.sleep(0.005)
+    return False
+
+
+def test_grabber_keeps_newest_frame_and_counts_drops():
+    with LatestFrameGrabber(ScriptedCapture(range(10))) as grabber:
+        assert wait_until(lambda: grabber.ended)
+
+        ret, frame = grabber.read_latest()
+        assert ret and frame == 9
+        assert grabber.frame_id == 10
+
+        # Nothing newer: the same frame is never returned twice
+        assert grabber.read_latest() == (False, None)
+        assert grabber.stats() == {"grabbed": 10, "dropped": 9, "failed": 0}
+
+
+def test_grabber_retries_failed_reads():
+    script = ["a", None, None, "b"]
+    with LatestFrameGrabber(ScriptedCapture(script), retry_delay=0.001) as grabber:
+        assert wait_until(lambda: grabber.ended)
+        assert grabber.read_latest() == (True, "b")
+        assert grabber.stats() == {"grabbed": 2, "dropped": 1, "failed": 2}
+
+
+def test_grabber_delivers_every_frame_to_a_fast_consumer():
+    frames = []
+    with LatestFrameGrabber(ScriptedCapture(range(5), delay=0.03)) as grabber:
+        while not grabber.finished:
+            ret, frame = grabber.read_latest()
+            if ret:
+                frames.append(frame)
+            time.sleep(0.002)
+
+    assert frames == list(range(5))
+    assert grabber.dropped == 0
+
+
+def record_archive(path, n=4, fps=50.0):
+    jpegs = []
+    with FrameRecorder(str(path)) as rec:
+        for i in range(n):
+            img = np.full((60, 80, 3), 50 * i, np.uint8)
+            jpeg = cv2.imencode(".jpg", img)[1].tobytes()
+            rec.write(jpeg, timestamp=100.0 + i / fps)
+            jpegs.append(jpeg)
+    return jpegs
+
+
+def test_replay_reports_eof(tmp_path):
+    path = tmp_path / "session.mjpg"
+    jpegs = record_archive(path)
+
+    src = ReplaySource(str(path), realtime=False)
+    assert [bytes(src.read_jpeg()) for _ in jpegs] == jpegs
+    assert src.eof
+    assert src.read_jpeg() is None
+
+    looping = ReplaySource(str(path), realtime=False, loop=True)
+    for _ in range(2 * len(jpegs)):
+        assert looping.read_jpeg() is not None
+    assert not looping.eof
+
+
+def test_grabber_finishes_at_end_of_archive(tmp_path):
+    path = tmp_path / "session.mjpg"
+    jpegs = record_archive(path)
+
+    frames = 0
+    with LatestFrameGrabber(str(path), native=True) as grabber:
+        deadline = time.time() + 5.0
+        while not grabber.finished and time.time() < deadline:
+            ret, frame = grabber.read_latest()
+            frames += ret
+            time.sleep(0.002)
+
+        # The reader thread stopped by itself instead of retrying forever
+        assert grabber.finished and grabber.ended
+        assert grabber._thread is None or not grabber._thread.is_alive()
+        assert grabber.failed == 0
+        assert frames + grabber.dropped == len(jpegs)
+        assert grabber.read_latest() == (False, None)
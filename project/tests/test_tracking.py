@@ -0,0 +1,67 @@
+import numpy as np
+
+from model.tracking import DetectionScheduler, QuadKalman
+
+
+QUAD = np.array([(100, 100), (500, 100), (500, 400), (100, 400)], float)
+
+
+def test_kalman_tracks_constant_velocity():
+    kalman = QuadKalman(accel_std=50.0, meas_std=1.0)
+    velocity = np.array([60.0, -30.0])   # px/s
+
+    for i in range(30):
+        t = i / 30.0
+        kalman.predict(t)
+        kalman.update(QUAD + velocity * t, t)
+
+    # One frame ahead, the prediction follows the motion
+    t = 30 / 30.0
+    predicted = kalman.predict(t)
+    assert np.abs(predicted - (QUAD + velocity * t)).max() < 1.0
+
+
+def test_kalman_innovation():
+    kalman = QuadKalman()
+    assert kalman.predict(0.0) is None
+    assert kalman.innovation(QUAD) == np.inf
+
+    kalman.update(QUAD, 0.0)
+    kalman.predict(0.0)
+    assert kalman.innovation(QUAD + (3.0, 0.0)) == 3.0
+
+    kalman.reset()
+    assert not kalman.initialized
+
+
+def test_scheduler_detects_every_n_frames():
+    scheduler = DetectionScheduler(every=4, max_innovation=12.0)
+    pattern = []
+    for _ in range(12):
+        if scheduler.should_detect():
+            pattern.append("D")
+            scheduler.detected(1.0)
+        else:
+            pattern.append("p")
+            scheduler.predicted()
+    assert "".join(pattern) == "DpppDpppDppp"
+
+
+def test_scheduler_forces_detection_on_large_innovation():
+    scheduler = DetectionScheduler(every=30, max_innovation=12.0)
+
+    scheduler.detected(None)            # failed detection
+    assert scheduler.should_detect()
+    scheduler.detected(20.0)            # jump: keep detecting
+    assert scheduler.should_detect()
+    scheduler.detected(2.0)             # settled
+    assert not scheduler.should_detect()
+
+    scheduler.predicted(3.0)            # flow within bounds
+    assert not scheduler.should_detect()
+    scheduler.predicted(15.0)           # flow jump: detect next frame
+    assert scheduler.should_detect()
+
+    scheduler.detected(2.0)
+    scheduler.reset()
+    assert scheduler.should_detect()
@@ -0,0 +1,58 @@
+import numpy as np
+import pytest
+
+from model.hand_backends import hand_pose, pinch_track, swipe_track
+from model.trajectory import INDEX_TIP, GestureClassifier, LandmarkRing
+
+
+FPS = 30.0
+
+
+def run(classifier, track, t0=0.0):
+    """Feeds a landmark track at FPS; returns the non-None events."""
+    events = []
+    for i, pts in enumerate(track):
+        event = classifier.update(t0 + i / FPS, pts)
+        if event is not None:
+            events.append(event)
+    return events
+
+
+def test_ring_windows_are_contiguous_after_wraparound():
+    ring = LandmarkRing(capacity=8)
+    for i in range(20):
+        ring.push(float(i), hand_pose(0.01 * i, 0.5))
+
+    t, p = ring.last()
+    assert len(ring) == 8
+    assert t.tolist() == [float(i) for i in range(12, 20)]
+    assert np.allclose(p[:, INDEX_TIP, 0], 0.01 * np.arange(12, 20))
+
+    t, _ = ring.since(17.0)
+    assert t.tolist() == [17.0, 18.0, 19.0]
+
+    ring.clear()
+    assert len(ring.last()[0]) == 0
+
+
+@pytest.mark.parametrize("direction", ["left", "right", "up", "down"])
+def test_swipe_direction(direction):
+    events = run(GestureClassifier(), swipe_track(direction))
+    assert events == [direction]
+
+
+def test_slow_motion_is_not_a_swipe():
+    track = [hand_pose(0.3 + 0.002 * i, 0.5) for i in range(90)]
+    assert run(GestureClassifier(), track) == []
+
+
+def test_pinch_and_release():
+    events = run(GestureClassifier(), pinch_track())
+    assert events == ["pinch", "release"]
+
+
+def test_reset_releases_held_pinch():
+    classifier = GestureClassifier()
+    assert run(classifier, pinch_track(hold=8, still=6)[:14]) == ["pinch"]
+    assert classifier.reset() == "release"
+    assert classifier.reset() is None
@@ -0,0 +1,237 @@
+"""
+actions.py
+
+OS actions triggered by gestures, executed off the vision loop:
+    - PynputBackend    : scroll / Cmd+Tab app switching / pinch-drag
+                         (left button) through pynput
+    - NullBackend      : no-op (headless benchmarks, machines without pynput)
+    - make_backend()   : pynput when importable, otherwise the no-op backend
+    - ActionDispatcher : bounded queue + worker thread; the vision loop only
+                         enqueues. Repeated scrolls coalesce into one queue
+                         entry and app switches are rate-limited.
+"""
+
+import collections
+import threading
+import time
+
+
+# ============================================================
+# 1. Backends
+# ============================================================
+class NullBackend:
+    """Accepts every action and does nothing (optionally prints it)."""
+
+    name = "null"
+
+    def __init__(self, verbose=False):
+        self.verbose = verbose
+
+    def scroll(self, clicks):
+        if self.verbose:
+            print(f"[actions] scroll {clicks:+d}")
+
+    def switch_app(self, direction):
+        if self.verbose:
+            print(f"[actions] switch app {direction}")
+
+    def button(self, state):
+        if self.verbose:
+            print(f"[actions] button {state}")
+
+
+class PynputBackend:
+    """Mouse wheel, Cmd+Tab switching and left-button pinch via pynput."""
+
+    name = "pynput"
+
+    def __init__(self, scroll_step=20, scroll_repeat=10):
+        from pynput.keyboard import Controller, Key
+        from pynput.mouse import Button, Controller as MouseController
+
+        self.keyboard = Controller()
+        self.mouse = MouseController()
+        self.Key = Key
+        self.Button = Button
+        self.scroll_step = scroll_step
+        self.scroll_repeat = scroll_repeat
+
+    def scroll(self, clicks):
+        """clicks: signed number of (coalesced) scroll gestures."""
+        step = self.scroll_step if clicks > 0 else -self.scroll_step
+        for _ in range(abs(clicks) * self.scroll_repeat):   # smooth effect
+            self.mouse.scroll(0, step)
+
+    def switch_app(self, direction):
+        """
+        direction: 'left' or 'right'
+        Performs Cmd+Tab and then Arrow Left/Right while Cmd is still held.
+        """
+        Key = self.Key
+
+        # Hold ⌘
+        self.keyboard.press(Key.cmd)
+
+        # Switcher opens only when Tab is pressed WHILE Cmd is held
+        self.keyboard.press(Key.tab)
+        self.keyboard.release(Key.tab)
+
+        # VERY IMPORTANT: tiny delay helps macOS register switcher
+        time.sleep(0.05)
+
+        # Move left or right inside app switcher
+        arrow = Key.left if direction == "left" else Key.right
+        self.keyboard.press(arrow)
+        self.keyboard.release(arrow)
+
+        # Release ⌘ **AFTER** arrow navigation
+        self.keyboard.release(Key.cmd)
+
+    def button(self, state):
+        """Pinch holds the left button, release lets go (click or drag)."""
+        if state == "press":
+            self.mouse.press(self.Button.left)
+        else:
+            self.mouse.release(self.Button.left)
+
+
+def make_backend(**kwargs):
+    try:
+        return PynputBackend(**kwargs)
+    except ImportError:
+        print("⚠ pynput not installed. Gestures will only be printed, not sent to OS.")
+        return NullBackend(verbose=True)
+
+
+# ============================================================
+# 2. Dispatcher
+# ============================================================
+SCROLLS = {"up": 1, "down": -1}
+SWITCHES = ("left", "right")
+BUTTONS = {"pinch": "press", "release": "release"}
+
+
+class ActionDispatcher:
+    """
+    dispatch(direction) never blocks: it appends to a queue of at most
+    `maxsize` pending actions and returns. A scroll in the same direction
+    as the newest pending scroll is merged into it; app switches closer
+    than `switch_interval` seconds to the previous one are discarded.
+    """
+
+    def __init__(self, backend=None, maxsize=8, switch_interval=0.6):
+        self.backend = backend if backend is not None else make_backend()
+        self.maxsize = maxsize
+        self.switch_interval = switch_interval
+
+        self._cond = threading.Condition()
+        self._pending = collections.deque()     # [kind, value]
+        self._last_switch = None
+
+        self.dispatched = 0
+        self.executed = 0
+        self.coalesced = 0
+        self.rate_limited = 0
+        self.dropped = 0
+        self.failed = 0
+
+        self._running = False
+        self._thread = None
+
+    def start(self):
+        if self._running:
+            return self
+        self._running = True
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def dispatch(self, direction, now=None):
+        """Queue the action for a gesture. Returns False if it was discarded."""
+        now = time.time() if now is None else now
+
+        with self._cond:
+            self.dispatched += 1
+
+            if direction in SCROLLS:
+                clicks = SCROLLS[direction]
+                tail = self._pending[-1] if self._pending else None
+                if tail is not None and tail[0] == "scroll" and (tail[1] > 0) == (clicks > 0):
+                    tail[1] += clicks
+                    self.coalesced += 1
+                    return True
+                item = ["scroll", clicks]
+
+            elif direction in SWITCHES:
+                if self._last_switch is not None and now - self._last_switch < self.switch_interval:
+                    self.rate_limited += 1
+                    return False
+                item = ["switch", direction]
+
+            elif direction in BUTTONS:
+                item = ["button", BUTTONS[direction]]
+
+            else:
+                raise ValueError(f"Unknown gesture: {direction}")
+
+            # A release is never dropped, or the button would stay held
+            if len(self._pending) >= self.maxsize and item[1] != "release":
+                self.dropped += 1
+                return False
+
+            self._pending.append(item)
+            if item[0] == "switch":
+                # Only a switch that will actually run starts the interval
+                self._last_switch = now
+            self._cond.notify()
+            return True
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while self._running and not self._pending:
+                    self._cond.wait()
+                if not self._pending:
+                    return
+                kind, value = self._pending.popleft()
+
+            # A failing action (e.g. the OS refusing input) must not end
+            # the worker, or every later gesture would silently queue up
+            try:
+                if kind == "scroll":
+                    self.backend.scroll(value)
+                elif kind == "switch":
+                    self.backend.switch_app(value)
+                else:
+                    self.backend.button(value)
+            except Exception as e:
+                self.failed += 1
+                print(f"✖ Action {kind} {value!r} failed: {e!r}")
+                continue
+            self.executed += 1
+
+    def stats(self):
+        return {
+            "backend": self.backend.name,
+            "dispatched": self.dispatched,
+            "executed": self.executed,
+            "coalesced": self.coalesced,
+            "rate_limited": self.rate_limited,
+            "dropped": self.dropped,
+            "failed": self.failed,
+        }
+
+    def stop(self):
+        """Runs the actions still queued, then stops the worker."""
+        with self._cond:
+            self._running = False
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join(timeout=2.0)
+            self._thread = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
@@ -0,0 +1,189 @@
+"""
+mjpeg.py
+
+Native reader for the ESP32 multipart/x-mixed-replace stream
+(see CameraStream/app.httpd.cpp):
+    - decode_jpeg(jpeg, scale, gray) : full / 1/2 / 1/4 decode, colour or gray
+    - MJPEGStream                    : HTTP multipart parser yielding raw JPEG bytes
+
+Raw JPEG bytes are handed out as-is; decoding happens only when asked for,
+at the scale/colour the caller needs.
+"""
+
+import re
+import urllib.request
+
+import cv2
+import numpy as np
+
+
+# imdecode flags per (scale, gray)
+DECODE_FLAGS = {
+    (1, False): cv2.IMREAD_COLOR,
+    (1, True):  cv2.IMREAD_GRAYSCALE,
+    (2, False): cv2.IMREAD_REDUCED_COLOR_2,
+    (2, True):  cv2.IMREAD_REDUCED_GRAYSCALE_2,
+    (4, False): cv2.IMREAD_REDUCED_COLOR_4,
+    (4, True):  cv2.IMREAD_REDUCED_GRAYSCALE_4,
+}
+
+DEFAULT_BOUNDARY = b"--frame"
+CHUNK_SIZE = 16384
+
+
+# ============================================================
+# 1. JPEG decode at reduced resolution
+# ============================================================
+def decode_jpeg(jpeg, scale=1, gray=False):
+    """
+    Decode JPEG bytes (bytes / bytearray / memoryview / uint8 array).
+    scale: 1, 2 or 4  → full, 1/2 or 1/4 resolution (DCT-domain, cheap)
+    """
+    flag = DECODE_FLAGS.get((scale, bool(gray)))
+    if flag is None:
+        raise ValueError(f"Unsupported decode scale: {scale} (use 1, 2 or 4)")
+
+    buf = np.frombuffer(jpeg, dtype=np.uint8)
+    if buf.size == 0:
+        return None
+    return cv2.imdecode(buf, flag)
+
+
+def _parse_boundary(content_type):
+    m = re.search(r'boundary="?([^";]+)"?', content_type or "")
+    if not m:
+        return DEFAULT_BOUNDARY
+    boundary = m.group(1).strip().encode("latin-1")
+    # The firmware declares "--frame" but delimits parts with "--frame",
+    # so match on the bare token with a single "--" prefix.
+    return b"--" + boundary.lstrip(b"-")
+
+
+# ============================================================
+# 2. Multipart MJPEG stream reader
+# ============================================================
+class MJPEGStream:
+    """
+    Minimal HTTP multipart parser for the ESP32 stream.
+
+    read_jpeg()          -> raw JPEG bytes of the next part (None on EOF)
+    read(scale, gray)    -> (ret, frame), cv2.VideoCapture-compatible
+    """
+
+    def __init__(self, url, timeout=5.0, scale=1, gray=False):
+        self.url = url
+        self.timeout = timeout
+        self.scale = scale
+        self.gray = gray
+
+        self._resp = None
+        self._buf = bytearray()
+        self._boundary = DEFAULT_BOUNDARY
+        self._synced = False
+
+        self.frames = 0
+        self.bytes_read = 0
+
+        try:
+            self._resp = urllib.request.urlopen(url, timeout=timeout)
+            self._boundary = _parse_boundary(
+                self._resp.headers.get("Content-Type")
+            )
+        except OSError as e:
+            print(f"⚠ Cannot open MJPEG stream {url}: {e}")
+            self._resp = None
+
+    def isOpened(self):
+        return self._resp is not None
+
+    def _fill(self):
+        chunk = self._resp.read1(CHUNK_SIZE)
+        if not chunk:
+            return False
+        self._buf += chunk
+        self.bytes_read += len(chunk)
+        return True
+
+    def _find(self, token, start=0):
+        """Index of token in the buffer, reading more data as needed."""
+        while True:
+            idx = self._buf.find(token, start)
+            if idx >= 0:
+                return idx
+            # Resume the search just before the unsearched tail
+            start = max(start, len(self._buf) - len(token) + 1)
+            if not self._fill():
+                return -1
+
+    def read_jpeg(self):
+        if self._resp is None:
+            return None
+
+        try:
+            # Skip to the first boundary once; afterwards each part's
+            # body ends right at the next boundary.
+            if not self._synced:
+                idx = self._find(self._boundary)
+                if idx < 0:
+                    return None
+                del self._buf[:idx + len(self._boundary)]
+                self._synced = True
+
+            # Part headers end with a blank line
+            hdr_end = self._find(b"\r\n\r\n")
+            if hdr_end < 0:
+                return None
+            headers = bytes(self._buf[:hdr_end])
+            body_start = hdr_end + 4
+
+            m = re.search(rb"content-length:\s*(\d+)", headers, re.I)
+            if m:
+                # Fast path: sized part, no scanning of the body
+                body_end = body_start + int(m.group(1))
+                while len(self._buf) < body_end:
+                    if not self._fill():
+                        return None
+                next_start = self._find(self._boundary, body_end)
+            else:
+                next_start = self._find(self._boundary, body_start)
+                body_end = next_start
+
+                # Drop the CRLFs before the delimiter (the firmware sends
+                # an extra one after each frame)
+                while (body_end - 2 >= body_start
+                       and self._buf[body_end - 2:body_end] == b"\r\n"):
+                    body_end -= 2
+
+            if next_start < 0:
+                return None
+
+            # Single copy out of the receive buffer
+            with memoryview(self._buf) as view:
+                jpeg = bytes(view[body_start:body_end])
+            del self._buf[:next_start + len(self._boundary)]
+
+        except OSError as e:
+            print(f"⚠ MJPEG stream error: {e}")
+            self.release()
+            return None
+
+        self.frames += 1
+        return jpeg
+
+    def read(self, scale=None, gray=None):
+        jpeg = self.read_jpeg()
+        if jpeg is None:
+            return False, None
+
+        frame = decode_jpeg(
+            jpeg,
+            self.scale if scale is None else scale,
+            self.gray if gray is None else gray,
+        )
+        return frame is not None, frame
+
+    def release(self):
+        if self._resp is not None:
+            self._resp.close()
+            self._resp = None
+        self._buf.clear()
@@ -0,0 +1,187 @@
+"""
+replay.py
+
+Record-and-replay archive for the raw ESP32 JPEG stream:
+    - FrameRecorder : append-only <name>.mjpg archive + <name>.mjpg.idx index
+    - ReplaySource  : memory-mapped replay, original timing or as fast as possible
+
+Index records are fixed-size (offset, length, capture timestamp), so the
+index can be appended frame by frame and loaded with a single np.fromfile.
+"""
+
+import os
+import time
+
+import numpy as np
+
+from utils.mjpeg import decode_jpeg
+
+
+ARCHIVE_EXT = ".mjpg"
+INDEX_EXT = ".idx"
+
+INDEX_DTYPE = np.dtype([
+    ("offset", "<u8"),
+    ("length", "<u4"),
+    ("timestamp", "<f8"),
+])
+
+
+def index_path(archive_path):
+    return archive_path + INDEX_EXT
+
+
+def is_archive(path):
+    return (isinstance(path, str)
+            and path.endswith(ARCHIVE_EXT)
+            and os.path.isfile(path))
+
+
+# ============================================================
+# 1. Recorder
+# ============================================================
+class FrameRecorder:
+    """
+    Appends raw JPEG frames to an archive. Re-opening an existing archive
+    continues it; the index stays consistent because each frame's data is
+    written before its index record.
+    """
+
+    def __init__(self, path):
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+
+        self.path = path
+        self._data = open(path, "ab")
+        self._index = open(index_path(path), "ab")
+        self._data.seek(0, os.SEEK_END)
+        self._offset = self._data.tell()
+        self.frames = 0
+
+    def write(self, jpeg, timestamp=None):
+        if timestamp is None:
+            timestamp = time.time()
+
+        length = len(jpeg)
+        self._data.write(jpeg)
+
+        record = np.array([(self._offset, length, timestamp)], dtype=INDEX_DTYPE)
+        self._index.write(record.tobytes())
+
+        self._offset += length
+        self.frames += 1
+
+    def flush(self):
+        self._data.flush()
+        self._index.flush()
+
+    def close(self):
+        if self._data is not None:
+            self._data.close()
+            self._index.close()
+            self._data = None
+            self._index = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# ============================================================
+# 2. Replay source
+# ============================================================
+class ReplaySource:
+    """
+    cv2.VideoCapture-compatible replay of a recorded archive.
+
+    realtime=True  → frames are served at their original capture timing
+    realtime=False → as fast as the consumer reads (benchmarks)
+    """
+
+    def __init__(self, path, realtime=True, loop=False, scale=1, gray=False):
+        if not os.path.isfile(path):
+            raise FileNotFoundError(f"Archive not found: {path}")
+
+        self.path = path
+        self.realtime = realtime
+        self.loop = loop
+        self.scale = scale
+        self.gray = gray
+
+        self.index = np.fromfile(index_path(path), dtype=INDEX_DTYPE)
+        self._data = np.memmap(path, dtype=np.uint8, mode="r") \
+            if os.path.getsize(path) > 0 else None
+
+        self.pos = 0
+        self.timestamp = 0.0
+        self._t0_wall = None
+        self._t0_rec = None
+
+    def __len__(self):
+        return len(self.index)
+
+    def isOpened(self):
+        return self._data is not None and len(self.index) > 0
+
+    @property
+    def eof(self):
+        """True once a non-looping replay has served its last frame."""
+        return not self.loop and self.pos >= len(self.index)
+
+    def duration(self):
+        if len(self.index) < 2:
+            return 0.0
+        return float(self.index["timestamp"][-1] - self.index["timestamp"][0])
+
+    def _pace(self, ts):
+        now = time.perf_counter()
+        if self._t0_wall is None:
+            self._t0_wall = now
+            self._t0_rec = ts
+            return
+
+        wait = (ts - self._t0_rec) - (now - self._t0_wall)
+        if wait > 0:
+            time.sleep(wait)
+
+    def read_jpeg(self):
+        """Zero-copy view of the next JPEG in the archive (None at the end)."""
+        if not self.isOpened():
+            return None
+
+        if self.pos >= len(self.index):
+            if not self.loop:
+                return None
+            self.pos = 0
+            self._t0_wall = None
+
+        offset, length, ts = self.index[self.pos]
+        self.pos += 1
+
+        if self.realtime:
+            self._pace(float(ts))
+
+        self.timestamp = float(ts)
+        return self._data[int(offset):int(offset) + int(length)]
+
+    def read(self, scale=None, gray=None):
+        jpeg = self.read_jpeg()
+        if jpeg is None:
+            return False, None
+
+        frame = decode_jpeg(
+            jpeg,
+            self.scale if scale is None else scale,
+            self.gray if gray is None else gray,
+        )
+        return frame is not None, frame
+
+    def rewind(self):
+        self.pos = 0
+        self._t0_wall = None
+
+    def release(self):
+        self._data = None
@@ -0,0 +1,394 @@
+"""
+stream.py
+
+Frame sources for the ESP32 camera stream:
+    - open_capture(source)     : URL / archive / capture object -> capture
+                                 (native MJPEG parser, replay or cv2.VideoCapture)
+    - iter_frames(source)      : frame generator over any of the above
+    - LatestFrameGrabber       : background decode thread, keeps newest frame only
+    - QualityController        : steps between the low/high/ultra endpoints
+                                 based on measured loop latency and frame rate
+"""
+
+import threading
+import time
+
+import cv2
+
+from utils.mjpeg import MJPEGStream, decode_jpeg
+from utils.replay import ReplaySource, is_archive
+
+
+# ============================================================
+# 1. Open a capture from a URL, archive or capture object
+# ============================================================
+def open_capture(source, native=False):
+    """
+    Return a cv2.VideoCapture-like object for `source`.
+    Anything exposing read() is passed through unchanged and recorded
+    .mjpg archives are replayed at their original timing. HTTP URLs are
+    opened with the native MJPEG parser when native=True, everything else
+    with cv2.VideoCapture.
+    """
+    if hasattr(source, "read"):
+        return source
+
+    if is_archive(source):
+        return ReplaySource(source, realtime=True)
+
+    if native and str(source).startswith("http"):
+        return MJPEGStream(source)
+
+    cap = cv2.VideoCapture(source)
+    # Keep the FFmpeg-side queue as short as the backend allows
+    cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+    return cap
+
+
+def iter_frames(source, scale=1, gray=False, limit=None):
+    """
+    Yield every frame of `source` in order (no dropping).
+    Archives opened from a path are replayed as fast as possible.
+    """
+    if is_archive(source):
+        cap = ReplaySource(source, realtime=False)
+    else:
+        cap = open_capture(source, native=True)
+
+    n = 0
+    try:
+        while limit is None or n < limit:
+            if hasattr(cap, "read_jpeg"):
+                jpeg = cap.read_jpeg()
+                if jpeg is None:
+                    break
+                frame = decode_jpeg(jpeg, scale, gray)
+            else:
+                ret, frame = cap.read()
+                if not ret:
+                    break
+            if frame is None:
+                continue
+            n += 1
+            yield frame
+    finally:
+        if cap is not source:
+            cap.release()
+
+
+# ============================================================
+# 2. Threaded latest-frame grabber
+# ============================================================
+class LatestFrameGrabber:
+    """
+    Decodes frames on a background thread and keeps only the newest one.
+    Frames that are overwritten before the consumer reads them are counted
+    in `dropped`, so a slow processing loop never works on stale frames.
+
+    Sources exposing read_jpeg() (MJPEGStream) are kept as raw JPEG bytes
+    and only decoded when consumed, at the scale/colour the caller asks for.
+
+    Failed reads are retried, except when the source has ended (a replay
+    past its last frame, or a capture that closed): the thread then stops
+    and `finished` turns True once the last frame has been read.
+    """
+
+    def __init__(self, source, retry_delay=0.03, native=False):
+        self.source = source
+        self.retry_delay = retry_delay
+        self.cap = open_capture(source, native=native)
+        self.raw = hasattr(self.cap, "read_jpeg")
+
+        self._lock = threading.Lock()
+        self._data = None
+        self._frame_id = 0
+        self._timestamp = 0.0
+        self._consumed = True
+
+        # Id / capture time of the frame last returned by read_latest()
+        self.frame_id = 0
+        self.timestamp = 0.0
+        self.jpeg = None
+
+        self.grabbed = 0
+        self.dropped = 0
+        self.failed = 0
+        self.ended = False
+
+        self._running = False
+        self._thread = None
+
+    def isOpened(self):
+        return self.cap is not None and self.cap.isOpened()
+
+    def start(self):
+        if self._running:
+            return self
+        if not self.isOpened():
+            raise RuntimeError(f"Cannot open stream: {self.source}")
+
+        self._running = True
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def _run(self):
+        while self._running:
+            if self.raw:
+                data = self.cap.read_jpeg()
+                ret = data is not None
+            else:
+                ret, data = self.cap.read()
+
+            if not ret:
+                if self._source_ended():
+                    self.ended = True
+                    self._running = False
+                    return
+                self.failed += 1
+                time.sleep(self.retry_delay)
+                continue
+
+            now = time.time()
+            with self._lock:
+                if not self._consumed:
+                    self.dropped += 1
+                self._data = data
+                self._frame_id += 1
+                self._timestamp = now
+                self._consumed = False
+                self.grabbed += 1
+
+    def _source_ended(self):
+        return getattr(self.cap, "eof", False) or not self.cap.isOpened()
+
+    @property
+    def finished(self):
+        """The source has ended and its last frame was already returned."""
+        with self._lock:
+            return self.ended and self._consumed
+
+    def _take(self):
+        with self._lock:
+            if self._consumed:
+                return None
+            self._consumed = True
+            self.frame_id = self._frame_id
+            self.timestamp = self._timestamp
+            return self._data
+
+    def read_latest(self, scale=1, gray=False):
+        """
+        Non-blocking. Returns (True, frame) if a frame newer than the
+        previous call is available, else (False, None); after the end of
+        the source it keeps returning (False, None) with `finished` set.
+        scale/gray only apply to raw JPEG sources.
+        """
+        data = self._take()
+        if data is None:
+            return False, None
+
+        if not self.raw:
+            return True, data
+
+        self.jpeg = data
+        frame = decode_jpeg(data, scale, gray)
+        return frame is not None, frame
+
+    def read_latest_jpeg(self):
+        """Non-blocking. Returns (True, jpeg_bytes) for raw JPEG sources."""
+        if not self.raw:
+            raise TypeError("read_latest_jpeg() needs a raw JPEG source")
+        data = self._take()
+        if data is None:
+            return False, None
+        self.jpeg = data
+        return True, data
+
+    def read(self):
+        """cv2.VideoCapture-compatible alias for read_latest()."""
+        return self.read_latest()
+
+    def stats(self):
+        return {
+            "grabbed": self.grabbed,
+            "dropped": self.dropped,
+            "failed": self.failed,
+        }
+
+    def release(self):
+        self._running = False
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+            self._thread = None
+        if self.cap is not None:
+            self.cap.release()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+# ============================================================
+# 3. Adaptive stream quality
+# ============================================================
+# Firmware endpoints, lowest to highest resolution
+STREAM_LEVELS = [
+    ("low",   "/low-quality-stream"),     # VGA  q25
+    ("high",  "/high-quality-stream"),    # SVGA q12
+    ("ultra", "/ultra-quality-stream"),   # UXGA q8
+]
+
+# Pixels per frame of each level: processing cost scales with them
+STREAM_PIXELS = {
+    "low":   640 * 480,
+    "high":  800 * 600,
+    "ultra": 1600 * 1200,
+}
+
+
+class QualityController:
+    """
+    Tracks end-to-end loop latency (capture → result) and processed frame
+    rate, and picks the stream level: one step down when the loop falls
+    behind, one step up when there is clear headroom.
+
+    Down and up use separate thresholds (hysteresis): down when latency
+    exceeds max_latency or the rate drops below min_fps; up only when the
+    latency *predicted for the next level* (scaled by its pixel count)
+    stays under up_fraction * max_latency and the rate is above up_fps.
+    A step up that has to be undone within `settle` seconds doubles the
+    wait before the next attempt (up to max_cooldown), and so does a level
+    whose stream could not be opened (see failed()).
+    """
+
+    def __init__(self, base_url, level="high",
+                 max_latency=0.15, min_fps=8.0,
+                 up_fraction=0.5, up_fps=None, alpha=0.1,
+                 min_samples=30, cooldown=3.0,
+                 settle=10.0, max_cooldown=60.0):
+        self.base_url = base_url.rstrip("/")
+        self.names = [name for name, _ in STREAM_LEVELS]
+        self.level = self.names.index(level)
+
+        self.max_latency = max_latency
+        self.min_fps = min_fps
+        self.up_latency = up_fraction * max_latency
+        self.up_fps = 1.5 * min_fps if up_fps is None else up_fps
+        self.alpha = alpha
+        self.min_samples = min_samples
+        self.cooldown = cooldown
+        self.settle = settle
+        self.max_cooldown = max_cooldown
+
+        self.up_cooldown = cooldown
+        self.switches = 0
+        self.failures = 0
+        self._prev_level = None
+        self._last_switch = None
+        self._last_up = None
+        self._reset()
+
+    @classmethod
+    def from_url(cls, url, **kwargs):
+        """Controller for a firmware stream URL, or None for other sources."""
+        if not isinstance(url, str):
+            return None
+        for name, path in STREAM_LEVELS:
+            if url.startswith("http") and url.endswith(path):
+                return cls(url[:-len(path)], level=name, **kwargs)
+        return None
+
+    def _reset(self):
+        self.latency = None
+        self.fps = None
+        self.samples = 0
+        self._last_update = None
+
+    @property
+    def name(self):
+        return self.names[self.level]
+
+    @property
+    def url(self):
+        return self.base_url + STREAM_LEVELS[self.level][1]
+
+    def _ema(self, prev, value):
+        return value if prev is None else (1 - self.alpha) * prev + self.alpha * value
+
+    def update(self, latency, now=None):
+        """
+        Record one processed frame. Returns True if the level changed
+        (the caller should reopen the stream at self.url).
+        """
+        now = time.time() if now is None else now
+
+        self.latency = self._ema(self.latency, latency)
+        if self._last_update is not None:
+            dt = now - self._last_update
+            if dt > 0:
+                self.fps = self._ema(self.fps, 1.0 / dt)
+        self._last_update = now
+        self.samples += 1
+
+        if self.samples < self.min_samples:
+            return False
+        if self._last_switch is not None and now - self._last_switch < self.cooldown:
+            return False
+
+        behind = self.latency > self.max_latency or self.fps < self.min_fps
+        if behind and self.level > 0:
+            # Undoing a recent step up: wait longer before the next one
+            if self._last_up is not None and now - self._last_up < self.settle:
+                self.up_cooldown = min(2 * self.up_cooldown, self.max_cooldown)
+            self._last_up = None
+            return self._switch(self.level - 1, now)
+
+        # A step up that held for `settle` seconds resets the back-off
+        if self._last_up is not None and now - self._last_up >= self.settle:
+            self.up_cooldown = self.cooldown
+            self._last_up = None
+
+        if self.level == len(self.names) - 1:
+            return False
+        if self._last_switch is not None and now - self._last_switch < self.up_cooldown:
+            return False
+
+        ratio = STREAM_PIXELS[self.names[self.level + 1]] / STREAM_PIXELS[self.name]
+        if self.latency * ratio < self.up_latency and self.fps > self.up_fps:
+            self._last_up = now
+            return self._switch(self.level + 1, now)
+        return False
+
+    def failed(self, now=None):
+        """
+        The stream at self.url could not be opened after a switch: go back
+        to the previous level (the caller reopens self.url) and back off
+        before the next step up. Returns False if there is nothing to undo.
+        """
+        now = time.time() if now is None else now
+        if self._prev_level is None:
+            return False
+
+        old = self.name
+        self.level, self._prev_level = self._prev_level, None
+        self.failures += 1
+        self.up_cooldown = min(2 * self.up_cooldown, self.max_cooldown)
+        self._last_up = None
+        self._last_switch = now
+        print(f"📶 Stream quality {old} unavailable, back to {self.name}")
+        self._reset()
+        return True
+
+    def _switch(self, level, now):
+        old = self.name
+        self._prev_level = self.level
+        self.level = level
+        self.switches += 1
+        self._last_switch = now
+        print(f"📶 Stream quality {old} → {self.name} "
+              f"(latency {self.latency * 1000:.0f} ms, {self.fps:.1f} fps)")
+        self._reset()
+        return True